@@ -0,0 +1,78 @@
+import time
+import pandas as pd
+from datetime import datetime, timezone
+
+BOOTSTRAP_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
+
+# the api sends these as strings, e.g. "5.3"
+DECIMAL_COLUMNS = ['form','points_per_game','selected_by_percent','value_form','value_season','ep_this','ep_next',
+                   'influence','creativity','threat','ict_index','expected_goals','expected_assists',
+                   'expected_goal_involvements','expected_goals_conceded']
+
+class BootstrapSnapshot:
+    # one parsed bootstrap-static payload per process, shared by every pipeline
+    _shared = None
+
+    def __init__(self, loader):
+        self.loader = loader
+        data = loader.load_json(BOOTSTRAP_URL)
+        self.fetched_at = time.time()
+        self._events = self.events_processing(pd.DataFrame(data['events']))
+        self._elements = self.elements_processing(pd.DataFrame(data['elements']))
+        self._teams = pd.DataFrame(data['teams'])
+        self._element_types = pd.DataFrame(data['element_types'])
+        self._current_gw = None
+        if loader.cache is not None:
+            loader.cache.set_finalised_gw(self.last_finalised_gw())
+
+    @classmethod
+    def shared(cls, loader, max_age=None):
+        # max_age (seconds) lets long lived processes such as the web app pick up a fresh payload
+        snapshot = cls._shared
+        if snapshot is None or (max_age is not None and time.time() - snapshot.fetched_at > max_age):
+            snapshot = cls(loader)
+            cls._shared = snapshot
+        return snapshot
+
+    @classmethod
+    def clear(cls):
+        cls._shared = None
+
+    def events_processing(self, df):
+        df['deadline_time'] = pd.to_datetime(df['deadline_time'], utc=True)
+        return df
+
+    def elements_processing(self, df):
+        for col in DECIMAL_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+        return df
+
+    # callers get copies so that they can add or drop columns freely
+    @property
+    def events(self):
+        return self._events.copy()
+
+    @property
+    def elements(self):
+        return self._elements.copy()
+
+    @property
+    def teams(self):
+        return self._teams.copy()
+
+    @property
+    def element_types(self):
+        return self._element_types.copy()
+
+    # last gameweek whose data the api has checked, its history rows will not change anymore
+    def last_finalised_gw(self):
+        finalised = self._events[self._events['finished'] & self._events['data_checked']]
+        return int(finalised['id'].max()) if len(finalised) > 0 else 0
+
+    def get_current_gw(self):
+        if self._current_gw is None:
+            now = datetime.now(timezone.utc)
+            upcoming_gw = self._events[self._events['deadline_time'] > now].iloc[0]
+            self._current_gw = int(upcoming_gw['id'])
+        return self._current_gw
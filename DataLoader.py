@@ -1,6 +1,8 @@
 import pandas as pd
-import requests
+import time
+import HttpSession as hs
 from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -10,8 +12,11 @@ from selenium.webdriver.chrome.options import Options
 
 
 class DataLoader:
-    def __init__(self):
-        pass
+    def __init__(self, cache=None, session=None):
+        # cache is an optional ResponseCache used by every json api call
+        self.cache = cache
+        self.session = session if session is not None else hs.HttpSession.shared()
+        self.crawl_stats = None
     
     def load_data_selenium(_self, url, table_id):
         options = Options()
@@ -54,13 +59,89 @@ class DataLoader:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
-        response = requests.get(url, headers=headers)
+        response = self.session.get(url, headers=headers)
         response.raise_for_status()  # Raise an error for bad status codes
         return pd.read_html(StringIO(response.text), attrs={"id": table_id})[0]
     
-    def load_data_api(self, url,section):
-        response = requests.get(url)
+    def load_json(self, url):
+        if self.cache is None:
+            return self.session.get(url).json()
+
+        cacheable, ttl = self.cache.ttl(url)
+        if not cacheable:
+            return self.session.get(url).json()
+
+        entry = self.cache.get(url)
+        if entry is not None and self.cache.is_fresh(entry, ttl):
+            return entry['body']
+
+        # stale entries are revalidated with ETag / If-Modified-Since
+        headers = self.cache.conditional_headers(entry) if entry is not None else {}
+        response = self.session.get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(url, entry, ttl)
+            return entry['body']
+
         data = response.json()
+        if response.ok:
+            self.cache.put(url, data, response.headers, ttl)
+        return data
+
+    def load_data_api(self, url,section):
+        data = self.load_json(url)
+        return self.data_to_frame(data, section)
+
+    def load_json_concurrent(self, urls, workers=8):
+        # fetch every url on a thread pool, results are returned in the same order as urls
+        def fetch(url):
+            start = time.perf_counter()
+            data = self.load_json(url)
+            return data, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(fetch, urls))
+        elapsed = time.perf_counter() - start
+
+        latencies = pd.Series([latency for _, latency in results], dtype=float)
+        self.crawl_stats = {
+            'requests': len(results),
+            'workers': workers,
+            'elapsed_s': round(elapsed, 3),
+            'requests_per_s': round(len(results) / elapsed, 2) if elapsed > 0 else 0.0,
+            'latency_mean_s': round(latencies.mean(), 4) if len(latencies) else 0.0,
+            'latency_p50_s': round(latencies.quantile(0.5), 4) if len(latencies) else 0.0,
+            'latency_p95_s': round(latencies.quantile(0.95), 4) if len(latencies) else 0.0,
+            'latency_max_s': round(latencies.max(), 4) if len(latencies) else 0.0,
+        }
+        # session counters are cumulative for the process
+        self.crawl_stats.update({f'session_{k}': v for k, v in self.session.connection_stats().items()})
+        print(f"Crawled {len(results)} urls: {self.crawl_stats}")
+        return [data for data, _ in results]
+
+    def load_element_summaries(self, player_ids, workers=8, sections=('history', 'history_past')):
+        # one request per player, every section is accumulated column by column and built into a frame once
+        urls = [f"https://fantasy.premierleague.com/api/element-summary/{pid}/" for pid in player_ids]
+        payloads = self.load_json_concurrent(urls, workers)
+
+        columns = {section: {} for section in sections}
+        n_rows = {section: 0 for section in sections}
+        for pid, data in zip(player_ids, payloads):
+            for section in sections:
+                acc = columns[section]
+                for record in data.get(section) or []:
+                    if 'element' not in record:
+                        record = {**record, 'element': pid}
+                    for key in record:
+                        if key not in acc:
+                            acc[key] = [None] * n_rows[section]
+                    for key, values in acc.items():
+                        values.append(record.get(key))
+                    n_rows[section] += 1
+
+        return {section: pd.DataFrame(columns[section]) for section in sections}
+
+    def data_to_frame(self, data, section):
         # players_data = data['elements']
         if section != None:
             df = data[section]
@@ -77,7 +158,7 @@ class DataLoader:
         return df
     
     def load_live_team(self, url):
-        response = requests.get(url).json()
+        response = self.load_json(url)
         summary = {
             "player_name": response["player_first_name"] + " " + response["player_last_name"],
             "nationality": response["player_region_name"],
@@ -1,21 +1,92 @@
+import time
 import pandas as pd
 import numpy as np
-import DataLoader as dl
 import xgboost as xgb
-from sklearn.model_selection import RandomizedSearchCV
+from sklearn.model_selection import RandomizedSearchCV, ParameterSampler, cross_val_score
+from concurrent.futures import ProcessPoolExecutor
+
+def split_cpu_budget(cpu_budget, n_models):
+    # cores go first to one process per model, what is left per process is shared by the
+    # search's joblib workers and xgboost threads so that processes * n_jobs * nthread <= cpu_budget
+    processes = max(1, min(n_models, cpu_budget))
+    per_process = max(1, cpu_budget // processes)
+    nthread = 2 if per_process >= 4 else 1
+    n_jobs = max(1, per_process // nthread)
+    return processes, n_jobs, nthread
+
+def last_round(rounds):
+    # the gameweek a model is trained up to is the last round present in its training rows
+    return int(rounds.max()) if rounds is not None and len(rounds) > 0 else None
+
+def fit_model(model, X, y, rounds, n_jobs, nthread):
+    # runs in a worker process on a copy of the model, only the fitted estimator travels back
+    model.n_jobs, model.nthread = n_jobs, nthread
+    model.model = xgb.XGBRegressor(n_jobs=nthread)
+    model.train(X, y, rounds=rounds)
+    return model.model
+
+def train_in_parallel(jobs, cpu_budget):
+    # jobs is a list of (FantasyModel, X, y, rounds), every model is fitted in its own process
+    processes, n_jobs, nthread = split_cpu_budget(cpu_budget, len(jobs))
+    print(f"Training {len(jobs)} models: {processes} processes x {n_jobs} search jobs x {nthread} xgboost threads")
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(fit_model, model, X, y, rounds, n_jobs, nthread) for model, X, y, rounds in jobs]
+        for (model, _, _, _), future in zip(jobs, futures):
+            model.model = future.result()
+            model.n_jobs, model.nthread = n_jobs, nthread
+
+# position: (metric columns, strength difference column, negative branch multiplier, positive branch multiplier)
+# the added points are metric * positive multiplier, or -(1 - metric) * negative multiplier when the difference is < 0
+ADJUSTMENT_RULES = {
+    1: (['clean_sheets_per_match'], 'diff_def_att', 3, 3),
+    2: (['clean_sheets_per_match'], 'diff_def_att', 2, 2),
+    3: (['goals_per_match', 'assists_per_match'], 'diff_att_def', 1, 2),
+    4: (['goals_per_match', 'assists_per_match'], 'diff_att_def', 1, 3),
+}
 
 class FantasyModel:
-    def __init__(self,position):
+    def __init__(self,position,n_jobs=-1,nthread=None,registry=None,name=None,search='random',time_budget=None,
+                 update='refit',extra_rounds=50,drift_threshold=0.15,max_boosted_updates=8):
         self.position = position
-        self.loader = dl.DataLoader()
-        self.model = xgb.XGBRegressor()
+        # search='halving' races the candidates on a few boosting rounds first, time_budget (seconds) caps it
+        self.search = search
+        self.time_budget = time_budget
+        self.search_report = None
+        # update='boost' continues the saved booster on the rows of new gameweeks with extra_rounds more trees,
+        # a full retrain happens once the error on new rows drifts drift_threshold above the first measured error
+        # or after max_boosted_updates updates in a row
+        self.update = update
+        self.extra_rounds = extra_rounds
+        self.drift_threshold = drift_threshold
+        self.max_boosted_updates = max_boosted_updates
+        # with a registry the fitted model is saved under name and reused while the training data is unchanged
+        self.registry = registry
+        self.name = name
+        # n_jobs is the number of search fits run at once, nthread the threads of each xgboost fit
+        self.n_jobs = n_jobs
+        self.nthread = nthread
+        self.model = xgb.XGBRegressor(n_jobs=nthread)
 
-    def train(self, X, y):
+    def train(self, X, y, data_gw=None, rounds=None):
+        # with rounds the data gameweek is the last round in the training rows, not the caller's finished gameweek:
+        # a finished but unchecked gameweek is not in the store yet
+        if rounds is not None:
+            data_gw = last_round(rounds)
         # Convert object columns to numeric
         for col in X.columns:
             if X[col].dtype == "object":
                 X[col] = pd.to_numeric(X[col], errors="coerce")
 
+        meta = None
+        if self.registry is not None:
+            fingerprint = self.registry.fingerprint(X, y)
+            meta = self.registry.load_meta(self.name)
+            if meta is not None and meta['fingerprint'] == fingerprint:
+                print(f"{self.name}: training data unchanged, loading {meta['version']}")
+                self.model = self.registry.load_model(self.name, meta)
+                self.model.set_params(n_jobs=self.nthread)
+                return
+
         if self.position != 1:
             if self.position == 3:
                 y = np.clip(y, None, np.percentile(y, 96))
@@ -33,65 +104,133 @@ class FantasyModel:
             'reg_lambda': [0, 0.5, 1] 
         }
         
-        random_search = RandomizedSearchCV(self.model, param_distributions=param_dist, n_iter=40, cv=3, n_jobs=-1, verbose=2, random_state=27)
-        random_search.fit(X, y)
-        self.model = random_search.best_estimator_
+        extra_meta = {}
+        boosted = False
+        if self.update == 'boost' and self.can_continue(meta, X, data_gw, rounds):
+            boosted, extra_meta = self.continue_boosting(X, y, rounds, meta)
+
+        if boosted:
+            best_params = meta['best_params']
+        # one more gameweek of the same features: refit with the previous best params instead of searching again
+        elif (meta is not None and data_gw is not None and meta['data_gw'] is not None and data_gw - meta['data_gw'] == 1
+                and meta['features'] == [str(c) for c in X.columns]):
+            print(f"{self.name}: warm start from the best params of {meta['version']}")
+            best_params = meta['best_params']
+            self.model = xgb.XGBRegressor(n_jobs=self.nthread, **best_params)
+            self.model.fit(X, y)
+        elif self.search == 'halving':
+            start = time.perf_counter()
+            best_params = self.successive_halving(X, y, param_dist)
+            self.model = xgb.XGBRegressor(n_jobs=self.nthread, **best_params)
+            self.model.fit(X, y)
+            # include the final refit, as RandomizedSearchCV's timing does
+            self.search_report['fit_time_s'] = time.perf_counter() - start
+        else:
+            start = time.perf_counter()
+            random_search = RandomizedSearchCV(self.model, param_distributions=param_dist, n_iter=40, cv=3, n_jobs=self.n_jobs, verbose=2, random_state=27)
+            random_search.fit(X, y)
+            self.model = random_search.best_estimator_
+            best_params = random_search.best_params_
+            self.search_report = {'search': 'random', 'best_score': random_search.best_score_,
+                                  'best_rounds': random_search.best_params_['n_estimators'], 'fit_time_s': time.perf_counter() - start,
+                                  'fits': 40 * 3, 'boosting_rounds': int(sum(random_search.cv_results_['param_n_estimators']) * 3)}
+
+        if self.registry is not None:
+            self.registry.save(self.name, self.model, best_params, fingerprint, data_gw, extra_meta)
+
+    def can_continue(self, meta, X, data_gw, rounds):
+        return (meta is not None and rounds is not None and data_gw is not None and meta['data_gw'] is not None
+                and data_gw > meta['data_gw'] and meta['features'] == [str(c) for c in X.columns])
 
-    def predict(self, X):
+    def continue_boosting(self, X, y, rounds, meta):
+        # returns (boosted, extra meta); the previous model scores the new rows before it sees them
+        new_rows = (rounds > meta['data_gw']).to_numpy()
+        if not new_rows.any():
+            return False, {}
+        previous = self.registry.load_model(self.name, meta)
+        X_new, y_new = X[new_rows], np.asarray(y)[new_rows]
+        rmse = float(np.sqrt(np.mean((previous.predict(X_new) - y_new) ** 2)))
+        baseline = meta.get('baseline_rmse') or rmse
+        updates = meta.get('boosted_updates', 0)
+        drift = (rmse - baseline) / baseline if baseline > 0 else 0.0
+        print(f"{self.name}: rmse on new gameweeks {rmse:.3f}, baseline {baseline:.3f}, drift {drift:+.1%}")
+        if drift > self.drift_threshold or updates >= self.max_boosted_updates:
+            print(f"{self.name}: full retrain")
+            return False, {}
+
+        params = {**meta['best_params'], 'n_estimators': self.extra_rounds}
+        self.model = xgb.XGBRegressor(n_jobs=self.nthread, **params)
+        self.model.fit(X_new, y_new, xgb_model=previous.get_booster())
+        return True, {'baseline_rmse': baseline, 'boosted_updates': updates + 1, 'last_rmse': rmse}
+
+    def successive_halving(self, X, y, param_dist, n_candidates=40, min_rounds=50, factor=3):
+        # every candidate is cross validated with min_rounds trees, the best 1/factor move on with factor times more
+        # trees (up to the largest n_estimators) until one is left or time_budget runs out. The winner is returned with
+        # the number of trees it was last validated at, best_score and best_rounds come from that same rung.
+        start = time.perf_counter()
+        out_of_time = lambda: self.time_budget is not None and time.perf_counter() - start > self.time_budget
+        max_rounds = max(param_dist['n_estimators'])
+        sampled = {k: v for k, v in param_dist.items() if k != 'n_estimators'}
+        candidates = list(ParameterSampler(sampled, n_iter=n_candidates, random_state=27))
+        rounds = min_rounds
+        fits = 0
+        boosting_rounds = 0
+        best_score = None
+        best_rounds = None
+        while True:
+            scores = []
+            for params in candidates:
+                # checked before every candidate so a rung overruns the budget by one cross validation at most,
+                # the first candidate of the first rung always runs so there is something to return
+                if out_of_time() and (scores or best_score is not None):
+                    break
+                estimator = xgb.XGBRegressor(n_estimators=rounds, n_jobs=self.nthread, **params)
+                scores.append(cross_val_score(estimator, X, y, cv=3, n_jobs=self.n_jobs).mean())
+                fits += 3
+                boosting_rounds += 3 * rounds
+            if scores:
+                # candidates the budget did not reach drop out, an empty rung keeps the previous ranking
+                order = np.argsort(scores)[::-1]
+                candidates = [candidates[i] for i in order]
+                best_score = scores[order[0]]
+                best_rounds = rounds
+            if len(candidates) == 1 or rounds >= max_rounds or out_of_time():
+                break
+            candidates = candidates[:max(1, len(candidates) // factor)]
+            if len(candidates) == 1:
+                # a lone survivor has nothing left to be ranked against, it keeps the size it was validated at
+                break
+            rounds = min(rounds * factor, max_rounds)
+            print(f"Successive halving: {len(candidates)} candidates left, {rounds} rounds")
+
+        self.search_report = {'search': 'halving', 'best_score': best_score, 'best_rounds': best_rounds,
+                              'fit_time_s': time.perf_counter() - start, 'fits': fits, 'boosting_rounds': boosting_rounds}
+        return {**candidates[0], 'n_estimators': best_rounds}
+
+    def predict(self, X, available=None):
+        # available is a boolean vector aligned with the rows of X (e.g. status == 'a' per player_id),
+        # None treats every player as available
         for col in X.columns:
             if X[col].dtype == "object":
                 X[col] = pd.to_numeric(X[col], errors="coerce")
         Y = np.round(self.model.predict(X), 2)
-        added_numbers = pd.DataFrame()
-        if self.position == 1:
-            for idx, row in X.iterrows():
-                clean_sheets_per_match = row['clean_sheets_per_match']
-                diff_def_att = row['diff_def_att']
-                if diff_def_att < 0:
-                    added_numbers.loc[idx, 'expected_CS_points'] = -1*(1-clean_sheets_per_match) * 3
-                else:
-                    added_numbers.loc[idx, 'expected_CS_points'] = clean_sheets_per_match * 3
-            Y = Y + added_numbers['expected_CS_points']
-            # Y = Y * X['player_will_play']
-
-        elif self.position == 2:
-            for idx, row in X.iterrows():
-                clean_sheets_per_match = row['clean_sheets_per_match']
-                diff_def_att = row['diff_def_att']
-                if diff_def_att < 0:
-                    added_numbers.loc[idx, 'expected_CS_points'] = -1*(1-clean_sheets_per_match) * 2
-                else:
-                    added_numbers.loc[idx, 'expected_CS_points'] = clean_sheets_per_match * 2
-            Y = Y + added_numbers['expected_CS_points']
-            # Y = Y * X['player_will_play']
-
-        elif self.position == 3:
-            for idx, row in X.iterrows():
-                goal_involvements = row['goals_per_match'] + row['assists_per_match']
-                diff_att_def = row['diff_att_def']
-                if diff_att_def < 0:
-                    added_numbers.loc[idx, 'expected_CS_points'] = -1*(1-goal_involvements) * 1
-                else:
-                    added_numbers.loc[idx, 'expected_CS_points'] = goal_involvements * 2
-            Y = Y + added_numbers['expected_CS_points']
-            # Y = Y * X['player_will_play']
-        else:
-            for idx, row in X.iterrows():
-                goal_involvements = row['goals_per_match'] + row['assists_per_match']
-                diff_att_def = row['diff_att_def']
-                if diff_att_def < 0:
-                    added_numbers.loc[idx, 'expected_CS_points'] = -1*(1-goal_involvements) * 1
-                else:
-                    added_numbers.loc[idx, 'expected_CS_points'] = goal_involvements * 3
-            Y = Y + added_numbers['expected_CS_points']
-        
+        return self.adjust_predictions(X, Y, available)
+
+    def expected_points_adjustment(self, X):
+        # expected clean sheet (gk/def) or goal involvement (mid/fwd) points, negative when the matchup is unfavourable
+        metric_columns, diff_column, negative_multiplier, positive_multiplier = ADJUSTMENT_RULES.get(self.position, ADJUSTMENT_RULES[4])
+        metric = X[metric_columns].sum(axis=1, min_count=len(metric_columns)).to_numpy(dtype=float)
+        diff = X[diff_column].to_numpy(dtype=float)
+        return np.where(diff < 0, -1*(1-metric) * negative_multiplier, metric * positive_multiplier)
+
+    def adjust_predictions(self, X, Y, available=None):
+        Y = pd.Series(Y + self.expected_points_adjustment(X), index=X.index)
+
         X['player_will_play'] = X['player_will_play'].round()
         Y = Y * X['player_will_play']
         Y = Y.clip(lower=0)
 
-        player_stats = self.loader.load_data_api("https://fantasy.premierleague.com/api/bootstrap-static/",'elements')
-        status_map = dict(zip(player_stats['id'], player_stats['status']))
-        for idx, row in X.iterrows():
-            if status_map.get(row['player_id']) != 'a':
-                Y.loc[idx] = 0
+        # only available players score
+        if available is not None:
+            Y = Y.where(np.asarray(available, dtype=bool), 0)
         return np.round(Y, 2)
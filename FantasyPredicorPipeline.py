@@ -1,22 +1,63 @@
 import pandas as pd
+import numpy as np
 import os
+import time
+import BootstrapSnapshot as bs
+import HistoryStore as hs
+import PredictionTable as pt
+import RollingForm as rf
+import StageGraph as sg
+import RunReport as rr
+import FantasyModel as fm
 output_dir = 'predictions'
+history_path = 'all_players_neeew.csv'
 ou = 'logs'
 
 os.makedirs(output_dir, exist_ok=True)
 
+# reserved columns of the stored matrices
+TARGET_COLUMN = '__target'
+ROUND_COLUMN = '__round'
+ID_COLUMNS = ['__player_id', '__gw', '__fixture_id']
+
+# (feature column, home team column, away team column)
+TEAM_STRENGTH_COLUMNS = [
+    ('team_strength', 'strength', 'strength'),
+    ('team_strength_overall', 'strength_overall_home', 'strength_overall_away'),
+    ('team_strength_attack', 'strength_attack_home', 'strength_attack_away'),
+    ('team_strength_defence', 'strength_defence_home', 'strength_defence_away'),
+]
+
 class FantasyPredicorPipeline:
-    def __init__(self,loader,preprocessor,goalkeeper_model,defender_model,attacker_model,feature_engineering):
+    def __init__(self,loader,preprocessor,goalkeeper_model,defender_model,attacker_model,feature_engineering,crawl_workers=8,incremental=False,forward_model=None,cpu_budget=None,feature_store=None,stage_graph=None,profiler=None):
         self.loader = loader
         self.preprocessor = preprocessor
         self.goalkeeper_model = goalkeeper_model
         self.defender_model = defender_model
         self.attacker_model = attacker_model
+        # midfielders and forwards used to share attacker_model by retraining it, now each keeps its fitted model
+        self.forward_model = forward_model if forward_model is not None else fm.FantasyModel(attacker_model.position, registry=attacker_model.registry, name='forwards')
         self.feature_engineering = feature_engineering
         self.fixtures = None
         self.team_stats = None
         self.finished_gw = 0
         self.full_players = None
+        self.crawl_workers = crawl_workers
+        self.player_status = None
+        self.predictions = None
+        self.season_projections = None
+        self.incremental = incremental
+        self.history_store = hs.HistoryStore()
+        # with a cpu budget the four position models are trained in parallel processes sharing these cores
+        self.cpu_budget = cpu_budget
+        self.feature_store = feature_store
+        self.data_fingerprint = None
+        # checkpoints of the run stages, None keeps them in memory only
+        self.stage_graph = stage_graph
+        self.stage_log = []
+        self.report = None
+        # an optional Profiler.StageProfiler, off by default
+        self.profiler = profiler
 
     def append_team(self,df):
         fixt = self.fixtures[self.fixtures['finished'] == True]
@@ -29,42 +70,52 @@ class FantasyPredicorPipeline:
 
         df_left = df.add_prefix("player_")
         df_merged = pd.merge(df_left, df_merged, left_on="player_fixture", right_on="fixtures_id", how="inner")
-        ####### for each row i want to set will_play for players with minutes=0 to 0 and set home and way strengths
-        for idx, row in df_merged.iterrows():
-            if row['player_minutes'] == 0:
-                df_merged.loc[idx, 'player_will_play'] = 0
-            elif row['player_minutes'] < 60:
-                df_merged.loc[idx, 'player_will_play'] = 0.7
-            else:
-                df_merged.loc[idx, 'player_will_play'] = 1
-
-            if row['player_was_home'] == False:
-                #away match
-                #playerteam
-                df_merged.loc[idx, 'player_team_strength'] = row['awayteam_strength']
-                df_merged.loc[idx, 'player_team_strength_overall'] = row['awayteam_strength_overall_away']
-                df_merged.loc[idx, 'player_team_strength_attack'] = row['awayteam_strength_attack_away']
-                df_merged.loc[idx, 'player_team_strength_defence'] = row['awayteam_strength_defence_away']
-                #opponent
-                df_merged.loc[idx, 'opponent_team_strength'] = row['hometeam_strength']
-                df_merged.loc[idx, 'opponent_team_strength_overall'] = row['hometeam_strength_overall_home']
-                df_merged.loc[idx, 'opponent_team_strength_attack'] = row['hometeam_strength_attack_home']
-                df_merged.loc[idx, 'opponent_team_strength_defence'] = row['hometeam_strength_defence_home']
-
-            else:
-                #home match
-                #playerteam
-                df_merged.loc[idx, 'player_team_strength'] = row['hometeam_strength']
-                df_merged.loc[idx, 'player_team_strength_overall'] = row['hometeam_strength_overall_home']
-                df_merged.loc[idx, 'player_team_strength_attack'] = row['hometeam_strength_attack_home']
-                df_merged.loc[idx, 'player_team_strength_defence'] = row['hometeam_strength_defence_home']
-                #opponent
-                df_merged.loc[idx, 'opponent_team_strength'] = row['awayteam_strength']
-                df_merged.loc[idx, 'opponent_team_strength_overall'] = row['awayteam_strength_overall_away']
-                df_merged.loc[idx, 'opponent_team_strength_attack'] = row['awayteam_strength_attack_away']
-                df_merged.loc[idx, 'opponent_team_strength_defence'] = row['awayteam_strength_defence_away']
+        ####### set will_play for players with minutes=0 to 0 and set home and away strengths
+        minutes = df_merged['player_minutes']
+        df_merged['player_will_play'] = np.select([minutes == 0, minutes < 60], [0, 0.7], default=1)
+
+        home = (df_merged['player_was_home'] != False).to_numpy()
+        #playerteam
+        for column, home_column, away_column in TEAM_STRENGTH_COLUMNS:
+            df_merged[f'player_{column}'] = np.where(home, df_merged[f'hometeam_{home_column}'], df_merged[f'awayteam_{away_column}'])
+        #opponent
+        for column, home_column, away_column in TEAM_STRENGTH_COLUMNS:
+            df_merged[f'opponent_{column}'] = np.where(home, df_merged[f'awayteam_{away_column}'], df_merged[f'hometeam_{home_column}'])
         return df_merged
     
+    def fixture_context(self, fix_gw):
+        # one row per team and fixture of the gameweek(s), seen from that team's side: the team x gameweek fixture matrix
+        fixt = self.fixtures[self.fixtures['event'].isin(np.atleast_1d(fix_gw))]
+        df_left = fixt.add_prefix("fixtures_")
+        df_right = self.team_stats.add_prefix("awayteam_")
+        df_merged = pd.merge(df_left, df_right, left_on="fixtures_team_a", right_on="awayteam_id", how="inner")
+
+        df_right = self.team_stats.add_prefix('hometeam_')
+        df_merged = pd.merge(df_merged, df_right, left_on="fixtures_team_h", right_on="hometeam_id", how="inner")
+
+        sides = []
+        for was_home, team, opponent in [(True, 'hometeam', 'awayteam'), (False, 'awayteam', 'hometeam')]:
+            side = pd.DataFrame({
+                'fixtures_event': df_merged['fixtures_event'].astype(int),
+                'fixtures_id': df_merged['fixtures_id'],
+                # rolled averages turn player_team into a float
+                'player_team': df_merged[f'{team}_id'].astype(float),
+                'player_was_home': was_home,
+                'player_opponent_team': df_merged[f'{opponent}_id'],
+            })
+            for column, home_column, away_column in TEAM_STRENGTH_COLUMNS:
+                side[f'player_{column}'] = df_merged[f'{team}_{home_column if was_home else away_column}']
+            for column, home_column, away_column in TEAM_STRENGTH_COLUMNS:
+                side[f'opponent_{column}'] = df_merged[f'{opponent}_{away_column if was_home else home_column}']
+            sides.append(side)
+        return pd.concat(sides, ignore_index=True)
+
+    def append_fixture_context(self, df_player_avg, fix_gw):
+        # double gameweeks give a player one row per fixture, blank gameweeks give none
+        context = self.fixture_context(fix_gw)
+        df_left = pd.merge(df_player_avg, context, on='player_team', how='inner')
+        return df_left.sort_values(['player_id', 'fixtures_event', 'fixtures_id']).reset_index(drop=True)
+
     def goalkeeper_append_for_predictions(self, df, fix_gw):
         stats_to_average = ['player_points_per_game','player_goals_scored','player_assists','player_clean_sheets','player_goals_conceded','player_own_goals',
                             'player_penalties_saved','player_yellow_cards','player_red_cards','player_saves','player_bonus','player_bps','player_influence','player_creativity',
@@ -75,48 +126,7 @@ class FantasyPredicorPipeline:
                             'team_defense_efficiency',
 
                             ]
-        df_rolling = df.groupby('player_id')[stats_to_average].rolling(window=5, min_periods=1).mean().round(3).reset_index()
-        df_player_avg = df_rolling.groupby('player_id').last().reset_index()
-        fixt = self.fixtures[self.fixtures['event'] == fix_gw]
-        df_left = fixt.add_prefix("fixtures_")
-        df_right = self.team_stats.add_prefix("awayteam_")
-        df_merged = pd.merge(df_left, df_right, left_on="fixtures_team_a", right_on="awayteam_id", how="inner")
-
-        df_right = self.team_stats.add_prefix('hometeam_')
-        df_merged = pd.merge(df_merged, df_right, left_on="fixtures_team_h", right_on="hometeam_id", how="inner")
-        df_left = df_player_avg.copy()
-
-        for idx,p in df_left.iterrows():
-            for _,f in df_merged.iterrows():
-                if p['player_team'] == f['fixtures_team_h']:
-                    #home match
-                    df_left.loc[idx,'player_was_home'] = True
-                    df_left.loc[idx, 'player_team_strength'] = f['hometeam_strength']
-                    df_left.loc[idx, 'player_team_strength_overall'] = f['hometeam_strength_overall_home']
-                    df_left.loc[idx, 'player_team_strength_attack'] = f['hometeam_strength_attack_home']
-                    df_left.loc[idx, 'player_team_strength_defence'] = f['hometeam_strength_defence_home']
-
-                    df_left.loc[idx, 'player_opponent_team'] = f['fixtures_team_a']
-                    df_left.loc[idx, 'opponent_team_strength'] = f['awayteam_strength']
-                    df_left.loc[idx, 'opponent_team_strength_overall'] = f['awayteam_strength_overall_away']
-                    df_left.loc[idx, 'opponent_team_strength_attack'] = f['awayteam_strength_attack_away']
-                    df_left.loc[idx, 'opponent_team_strength_defence'] = f['awayteam_strength_defence_away']
-
-                elif p['player_team'] == f['fixtures_team_a']:
-                    #away match
-                    df_left.loc[idx,'player_was_home'] = False
-                    df_left.loc[idx, 'player_opponent_team'] = f['fixtures_team_h']
-                    df_left.loc[idx, 'player_team_strength'] = f['awayteam_strength']
-                    df_left.loc[idx, 'player_team_strength_overall'] = f['awayteam_strength_overall_away']
-                    df_left.loc[idx, 'player_team_strength_attack'] = f['awayteam_strength_attack_away']
-                    df_left.loc[idx, 'player_team_strength_defence'] = f['awayteam_strength_defence_away']
-
-                    df_left.loc[idx, 'opponent_team_strength'] = f['hometeam_strength']
-                    df_left.loc[idx, 'opponent_team_strength_overall'] = f['hometeam_strength_overall_home']
-                    df_left.loc[idx, 'opponent_team_strength_attack'] = f['hometeam_strength_attack_home']
-                    df_left.loc[idx, 'opponent_team_strength_defence'] = f['hometeam_strength_defence_home']
-
-        return df_left
+        return self.append_fixture_context(rf.last_form(df, stats_to_average), fix_gw)
 
     def outfielders_append_for_predictions(self, df, fix_gw):
         stats_to_average = ['player_points_per_game','player_goals_scored','player_assists','player_clean_sheets','player_goals_conceded','player_own_goals',
@@ -128,50 +138,9 @@ class FantasyPredicorPipeline:
                             'clean_sheets_per_match','goals_per_match','assists_per_match','recoveries_per_match',
                             'tackles_per_match','interceptions_per_match','DC_per_match','team_defense_efficiency',
                             ]
-        df_rolling = df.groupby('player_id')[stats_to_average].rolling(window=5, min_periods=1).mean().round(3).reset_index()
-        df_player_avg = df_rolling.groupby('player_id').last().reset_index()
-        fixt = self.fixtures[self.fixtures['event'] == fix_gw]
-        df_left = fixt.add_prefix("fixtures_")
-        df_right = self.team_stats.add_prefix("awayteam_")
-        df_merged = pd.merge(df_left, df_right, left_on="fixtures_team_a", right_on="awayteam_id", how="inner")
+        return self.append_fixture_context(rf.last_form(df, stats_to_average), fix_gw)
 
-        df_right = self.team_stats.add_prefix('hometeam_')
-        df_merged = pd.merge(df_merged, df_right, left_on="fixtures_team_h", right_on="hometeam_id", how="inner")
-        df_left = df_player_avg.copy()
-
-        for idx,p in df_left.iterrows():
-            for _,f in df_merged.iterrows():
-                if p['player_team'] == f['fixtures_team_h']:
-                    #home match
-                    df_left.loc[idx,'player_was_home'] = True
-                    df_left.loc[idx, 'player_team_strength'] = f['hometeam_strength']
-                    df_left.loc[idx, 'player_team_strength_overall'] = f['hometeam_strength_overall_home']
-                    df_left.loc[idx, 'player_team_strength_attack'] = f['hometeam_strength_attack_home']
-                    df_left.loc[idx, 'player_team_strength_defence'] = f['hometeam_strength_defence_home']
-
-                    df_left.loc[idx, 'player_opponent_team'] = f['fixtures_team_a']
-                    df_left.loc[idx, 'opponent_team_strength'] = f['awayteam_strength']
-                    df_left.loc[idx, 'opponent_team_strength_overall'] = f['awayteam_strength_overall_away']
-                    df_left.loc[idx, 'opponent_team_strength_attack'] = f['awayteam_strength_attack_away']
-                    df_left.loc[idx, 'opponent_team_strength_defence'] = f['awayteam_strength_defence_away']
-
-                elif p['player_team'] == f['fixtures_team_a']:
-                    #away match
-                    df_left.loc[idx,'player_was_home'] = False
-                    df_left.loc[idx, 'player_opponent_team'] = f['fixtures_team_h']
-                    df_left.loc[idx, 'player_team_strength'] = f['awayteam_strength']
-                    df_left.loc[idx, 'player_team_strength_overall'] = f['awayteam_strength_overall_away']
-                    df_left.loc[idx, 'player_team_strength_attack'] = f['awayteam_strength_attack_away']
-                    df_left.loc[idx, 'player_team_strength_defence'] = f['awayteam_strength_defence_away']
-
-                    df_left.loc[idx, 'opponent_team_strength'] = f['hometeam_strength']
-                    df_left.loc[idx, 'opponent_team_strength_overall'] = f['hometeam_strength_overall_home']
-                    df_left.loc[idx, 'opponent_team_strength_attack'] = f['hometeam_strength_attack_home']
-                    df_left.loc[idx, 'opponent_team_strength_defence'] = f['hometeam_strength_defence_home']
-
-        return df_left
-
-    def train_goalkeepers(self, df, gw):
+    def prepare_goalkeepers(self, df):
         # Prepare data for finished GW
         goalkeepers_df = self.append_team(df)
         goalkeepers_df = self.feature_engineering.add_features(goalkeepers_df,self.full_players,1,True)
@@ -191,12 +160,10 @@ class FantasyPredicorPipeline:
         # Split the data into features (X) and target (y)
         X = goalkeepers_df[features]
         Y = goalkeepers_df['player_total_points']
-        # Train the model
-        self.goalkeeper_model.train(X, Y)
-        # X.to_csv(f"{ou}/goalkeepers_gw_{gw}_train.csv", index=False)
-        
+        return df, X, Y
 
-        # Prepare data for new GW
+    def goalkeeper_predict_matrix(self, df, gw):
+        # Prepare data for the new GW(s) from the featured training frame, gw may be a list to score them in one call
         goalkeepers_df = self.goalkeeper_append_for_predictions(df,gw)
         features_to_exclude = ['player_element_type','player_web_name','player_element','player_fixture','player_total_points','player_round'
                                 ,'fixtures_finished','fixtures_event','fixtures_stats','fixtures_code','fixtures_id','fixtures_team_a','fixtures_team_h',
@@ -215,19 +182,12 @@ class FantasyPredicorPipeline:
         # Split the data into features (X) and target (y)
         X = goalkeepers_df[features]
         X = self.feature_engineering.add_features(X,self.full_players,1,False)
-        X = X[self.goalkeeper_model.model.feature_names_in_]
-
         # X.to_csv(f"{ou}/goalkeepers_gw_{gw}_predict.csv", index=False)
+        return self.prediction_ids(goalkeepers_df), X
 
-        # Make and display predictions for the test set
-        test_predictions = self.goalkeeper_model.predict(X)
-        goalkeepers_df['predicted_points'] = test_predictions
-        goalkeepers_df = goalkeepers_df.sort_values(by='predicted_points', ascending=False)[[ 'player_id','predicted_points']]
-        return goalkeepers_df
-
-    def train_outfielders(self,df,gw,defender):
+    def prepare_outfielders(self,df,position):
         players = self.append_team(df)
-        players = self.feature_engineering.add_features(players,self.full_players,3 if not defender else 2,True)
+        players = self.feature_engineering.add_features(players,self.full_players,position,True)
         df = players.copy()
         # Prepare data for the finished GW
         features_to_exclude = ['player_element_type','player_web_name','player_element','player_fixture','player_total_points','player_round'
@@ -245,14 +205,10 @@ class FantasyPredicorPipeline:
         # Split the data into features (X) and target (y)
         X = players[features]
         Y = players['player_total_points']
-        # Train the model
-        if defender:
-            self.defender_model.train(X,Y)
-        else:
-            self.attacker_model.train(X,Y)
-        # X.to_csv(f"{ou}/outfielders_gw_{gw}_train.csv", index=False)
-        
-        # Prepare data for the new GW
+        return df, X, Y
+
+    def outfielders_predict_matrix(self,df,gw,position):
+        # Prepare data for the new GW(s) from the featured training frame, gw may be a list to score them in one call
         players = self.outfielders_append_for_predictions(df,gw)
 
         features_to_exclude = ['player_element_type','player_web_name','player_element','player_fixture','player_total_points','player_round'
@@ -270,139 +226,265 @@ class FantasyPredicorPipeline:
 
         # Split the data into features (X) and target (y)
         X = players[features]
-        if defender:
-            X = self.feature_engineering.add_features(X,self.full_players,2,False)
-            X = X[self.defender_model.model.feature_names_in_]
+        X = self.feature_engineering.add_features(X,self.full_players,position,False)
+        # X.to_csv(f"{ou}/outfielders_{position}_gw_{gw}_predict.csv", index=False)
+        return self.prediction_ids(players), X
+
+    def position_matrices(self, name, df, position, gws):
+        # (X, Y, rounds) to train and (ids, X) to predict one position, stored per (position, gameweek, data fingerprint)
+        key = (name, self.finished_gw, self.data_fingerprint)
+        predict_name = f"predict-{gws[0]}-{gws[-1]}"
+        if self.feature_store is not None:
+            train = self.feature_store.load(*key, 'train')
+            predict = self.feature_store.load(*key, predict_name)
+            if train is not None and predict is not None:
+                ids = predict[ID_COLUMNS].rename(columns=lambda c: c[2:])
+                return (train.drop(columns=[TARGET_COLUMN, ROUND_COLUMN]), train[TARGET_COLUMN], train[ROUND_COLUMN],
+                        ids, predict.drop(columns=ID_COLUMNS))
+
+        if position == 1:
+            df, X, Y = self.prepare_goalkeepers(df)
+            ids, X_predict = self.goalkeeper_predict_matrix(df, gws)
         else:
-            X = self.feature_engineering.add_features(X,self.full_players,3,False)
-            X = X[self.attacker_model.model.feature_names_in_]
-        # X.to_csv(f"{ou}/outfielders_gw_{gw}_predict.csv", index=False)
-
-        # Make and display predictions for the test set
-        if defender:
-            test_predictions = self.defender_model.predict(X)
+            df, X, Y = self.prepare_outfielders(df, position)
+            ids, X_predict = self.outfielders_predict_matrix(df, gws, position)
+        X, X_predict = self.numeric_matrix(X), self.numeric_matrix(X_predict.reset_index(drop=True))
+        rounds = df['player_round']
+
+        if self.feature_store is not None:
+            self.feature_store.save(*key, 'train', X.assign(**{TARGET_COLUMN: Y.to_numpy(), ROUND_COLUMN: rounds.to_numpy()}))
+            self.feature_store.save(*key, predict_name, pd.concat([ids.add_prefix('__'), X_predict], axis=1))
+        return X, Y, rounds, ids, X_predict
+
+    def numeric_matrix(self, X):
+        # the models read object columns as numbers, doing it here lets the stored matrices stay typed
+        X = X.copy()
+        for col in X.columns[X.dtypes == object]:
+            X[col] = pd.to_numeric(X[col], errors="coerce")
+        return X
+
+    def prediction_ids(self, df):
+        return df[['player_id', 'fixtures_event', 'fixtures_id']].rename(columns={'fixtures_event': 'gw', 'fixtures_id': 'fixture_id'}).reset_index(drop=True)
+
+    def score(self, model, ids, X):
+        # one row per player and fixture, double gameweeks are added up by the prediction table
+        predictions = ids.copy()
+        predictions['predicted_points'] = np.asarray(model.predict(X[model.model.feature_names_in_], self.availability(ids)))
+        return predictions
+
+    def availability(self, df):
+        # player status is read once per run from bootstrap-static, predict itself never goes to the network
+        return df['player_id'].map(self.player_status).eq('a').to_numpy()
+
+    def avg_points_last_3y(self, player_ids, past_seasons):
+        # average of the last 3 seasons per player, 0 for players without past seasons
+        avg_points_df = pd.DataFrame({'id': list(player_ids)})
+        avg_points_df['avg_points_last_3y'] = 0.0
+        if len(past_seasons) > 0:
+            past_seasons = past_seasons.sort_values("season_name", ascending=False).groupby('element').head(3)
+            avg_points = past_seasons.groupby('element')['total_points'].mean()
+            avg_points_df['avg_points_last_3y'] = avg_points_df['id'].map(avg_points).fillna(0)
+        return avg_points_df
+
+    def load_history(self, player_ids, bootstrap):
+        if self.incremental and (self.history_store.exists('history') or os.path.exists(history_path)):
+            return self.sync_history(player_ids, bootstrap)
+
+        summaries = self.loader.load_element_summaries(player_ids, self.crawl_workers)
+        avg_points_df = self.avg_points_last_3y(player_ids, summaries['history_past'])
+        history = pd.merge(summaries['history'], avg_points_df, left_on='element', right_on="id", how="left")
+        history.to_csv(history_path, index=False)
+        self.history_store.write('history', history, partition_col='round')
+        return self.read_history()
+
+    def read_history(self):
+        # partitions come back in directory order, rolling features need each player's rounds in order
+        history = self.history_store.read('history', categoricals=False)
+        return history.sort_values(['element', 'kickoff_time', 'fixture']).reset_index(drop=True)
+
+    def sync_history(self, player_ids, bootstrap):
+        # Only finalised rounds are kept in the store. A player is refetched when bootstrap-static shows
+        # minutes that are not in the store yet or event_points that differ from the stored current round.
+        finalised_gw = bootstrap.last_finalised_gw()
+        current_gw = bootstrap.get_current_gw() - 1
+        if self.history_store.exists('history'):
+            store = self.history_store.read('history', categoricals=False)
         else:
-            test_predictions = self.attacker_model.predict(X)
-        players['predicted_points'] = test_predictions
-        players = players.sort_values(by='predicted_points', ascending=False)[['player_id', 'predicted_points']]
-        return players
-
-    def run(self,gw_start=0,gw_end=0):
-        deadlines = self.loader.load_data_api('https://fantasy.premierleague.com/api/bootstrap-static/','events')
-        self.finished_gw = self.preprocessor.get_current_gw(deadlines) - 1
-        
+            store = self.history_store.apply_schema(pd.read_csv(history_path), 'history')
+        store = store[store['round'] <= finalised_gw]
+        self.history_store.delete_partitions('history', [r for r in self.history_store.rounds() if r > finalised_gw])
+
+        elements = bootstrap.elements.set_index('id')
+        stored_minutes = store.groupby('element')['minutes'].sum()
+        stored_event_points = store[store['round'] == current_gw].groupby('element')['total_points'].sum()
+        ids = pd.Index(player_ids)
+        synced_gw = int(store['round'].max()) if len(store) > 0 else 0
+        if current_gw > finalised_gw and synced_gw >= finalised_gw:
+            # a gameweek has finished but is not data_checked yet: the bootstrap totals include rounds the store must not
+            # hold, the store is already synced to the finalised round, so everyone waits for the next finalisation
+            changed = np.zeros(len(ids), dtype=bool)
+        else:
+            changed = (~ids.isin(stored_minutes.index)
+                       | (elements.loc[ids, 'minutes'].values != stored_minutes.reindex(ids).fillna(0).values)
+                       | (elements.loc[ids, 'event_points'].values != stored_event_points.reindex(ids).fillna(0).values))
+        to_fetch = ids[changed].tolist()
+        print(f"Incremental sync: refetching {len(to_fetch)} of {len(ids)} players, finalised GW {finalised_gw}")
+
+        # the response cache revalidates element-summary once a gameweek is finalised, so these rows are final
+        summaries = self.loader.load_element_summaries(to_fetch, self.crawl_workers)
+        fresh = summaries['history']
+        changed_rounds = set()
+        if len(fresh) > 0:
+            fresh = fresh[fresh['round'] <= finalised_gw]
+            avg_points_df = self.avg_points_last_3y(to_fetch, summaries['history_past'])
+            fresh = pd.merge(fresh, avg_points_df, left_on='element', right_on="id", how="left")
+            # the api sends decimals as strings, match the dtypes read back from the store
+            for col in fresh.columns:
+                if col in store.columns and pd.api.types.is_numeric_dtype(store[col]):
+                    fresh[col] = pd.to_numeric(fresh[col], errors='coerce')
+            fresh = self.history_store.apply_schema(fresh, 'history')
+
+            # refetched players get their stored rows replaced, which also repairs rounds stored with provisional values
+            refetched = store['element'].isin(fresh['element'].unique())
+            changed_rounds = self.changed_rounds(store[refetched], fresh)
+            store = pd.concat([store[~refetched], fresh], ignore_index=True)
+
+        store = store[store['element'].isin(ids)]
+        store.to_csv(history_path, index=False)
+        if self.history_store.exists('history') and changed_rounds:
+            # only the rounds whose rows changed are rewritten, every other partition is left untouched
+            self.history_store.write_partitions('history', store[store['round'].isin(changed_rounds)])
+        elif not self.history_store.exists('history'):
+            self.history_store.write('history', store, partition_col='round')
+        return self.read_history()
+
+    def changed_rounds(self, old, fresh):
+        # rounds where a refetched player gained, lost or changed a fixture row
+        keys = ['element', 'fixture']
+        compare = [col for col in ['total_points', 'minutes', 'bonus', 'bps'] if col in old.columns and col in fresh.columns]
+        merged = pd.merge(fresh[keys + ['round'] + compare], old[keys + ['round'] + compare], on=keys, how='outer', suffixes=('', '_old'), indicator=True)
+        differs = merged['_merge'] != 'both'
+        for col in compare:
+            differs |= merged[col].to_numpy() != merged[f'{col}_old'].to_numpy()
+        rounds = merged.loc[differs, 'round'].fillna(merged.loc[differs, 'round_old'])
+        return set(rounds.astype(int))
+
+    def run(self,gw_start=0,gw_end=0,season=False):
+        graph = self.stage_graph if self.stage_graph is not None else sg.StageGraph(path=None)
+        self.report = rr.RunReport('predict', self.loader.session, profiler=self.profiler)
+        graph.report = self.report
+
+        # bootstrap and fixtures read the api, everything after them is skipped on resume when its inputs are unchanged
+        bootstrap = bs.BootstrapSnapshot.shared(self.loader)
+        # elements carry transfer counts, ownership and news that change every few minutes, the stage key only covers
+        # the processed player columns, teams and gameweeks the later stages actually read
+        player_stats, processed_stats, self.team_stats, self.finished_gw = graph.source(
+            'bootstrap',
+            lambda: (bootstrap.elements, self.preprocessor.players_processing(bootstrap.elements), bootstrap.teams, bootstrap.get_current_gw() - 1),
+            key_of=lambda result: (*result[1:], bootstrap.last_finalised_gw()))
+        self.player_status = player_stats.set_index('id')['status']
+
         # Set default range if not provided
         if gw_start == 0:
             gw_start = self.finished_gw + 1
         if gw_end == 0:
             gw_end = gw_start  # Single gameweek if no end specified
 
-        self.fixtures = self.loader.load_data_api('https://fantasy.premierleague.com/api/fixtures/',None)
-        player_stats = self.loader.load_data_api("https://fantasy.premierleague.com/api/bootstrap-static/",'elements')
+        self.fixtures = graph.source('fixtures', self.fixtures_stage)
+        if season:
+            # project every remaining gameweek of the season
+            gw_end = int(self.fixtures['event'].max())
+        gws = list(range(gw_start, gw_end + 1))
+
         player_ids_names = player_stats.copy()
         player_ids_names = player_ids_names[['id', 'web_name','team']]
-
-
-        self.team_stats = self.loader.load_data_api("https://fantasy.premierleague.com/api/bootstrap-static/",'teams')
         player_ids_names = pd.merge(player_ids_names, self.team_stats, left_on="team", right_on="id", how="inner")
         player_ids_names = player_ids_names[['id_x', 'web_name','team','name']]
-        self.fixtures = self.preprocessor.fixtures_processing(self.fixtures)
-
-        player_stats = self.preprocessor.players_processing(player_stats)
-
-        history = pd.DataFrame()
-        avg_points_list = []
-        for _, p in player_stats.iterrows():
-            pid = p["id"]
-            url = f"https://fantasy.premierleague.com/api/element-summary/{pid}/"
-            one_history = self.loader.load_data_api(url, 'history')
-            past_seasons = self.loader.load_data_api(url, 'history_past')
-
-            avg_points_last_3y = 0
-            if past_seasons is not None and len(past_seasons) > 0:
-                past_seasons_df = pd.DataFrame(past_seasons)
-                past_seasons_df = past_seasons_df.sort_values("season_name", ascending=False).head(3)
-                avg_points_last_3y = past_seasons_df["total_points"].mean()
-
-            avg_points_list.append({"id": pid, "avg_points_last_3y": avg_points_last_3y})
-            history = pd.concat([history, one_history], ignore_index=True)
-            print(f'load player {player_stats['web_name'][player_stats['id']==pid]}')
-
-        avg_points_df = pd.DataFrame(avg_points_list)
-        history = pd.merge(history,avg_points_df, left_on='element', right_on="id", how="left")
+        self.history_store.write('teams', self.team_stats)
+
+        player_stats = processed_stats
+        # a failed crawl is resumed from the response cache, finished players are not requested again
+        history = graph.stage('history', lambda: self.load_history(player_stats['id'].tolist(), bootstrap), inputs=['bootstrap'])
+        self.full_players, frames, self.team_stats = graph.stage('preprocess', lambda: self.preprocess_stage(player_stats, history), inputs=['bootstrap', 'history'])
+
+        positions = [('goalkeepers', 1, self.goalkeeper_model),
+                     ('defenders', 2, self.defender_model),
+                     ('midfielders', 3, self.attacker_model),
+                     ('forwards', 3, self.forward_model)]
+
+        # the matrices only depend on these inputs, unchanged inputs are read back from the feature store
+        if self.feature_store is not None:
+            self.data_fingerprint = self.feature_store.fingerprint(
+                [self.full_players, self.fixtures.drop(columns=['stats'], errors='ignore'), self.team_stats],
+                {'as_of': getattr(self.feature_engineering, 'as_of', False)})
+        feature_params = {'gws': gws, 'as_of': getattr(self.feature_engineering, 'as_of', False)}
+        matrices = {name: graph.stage(f'features-{name}', lambda name=name, position=position: self.position_matrices(name, frames[name], position, gws),
+                                      inputs=['fixtures', 'preprocess'], params=feature_params)
+                    for name, position, _ in positions}
+
+        with self.report.stage('train'):
+            self.train_stage(graph, positions, matrices)
+
+        # Every requested gameweek is stacked into one feature matrix and scored with a single predict call per position
+        print(f"Processing gameweeks {gw_start}-{gw_end}...")
+        predict_inputs = ['bootstrap'] + [f'features-{name}' for name, _, _ in positions] + [f'train-{name}' for name, _, _ in positions]
+        predicted = graph.stage('predict', lambda: {name: self.score(model, *matrices[name][3:]) for name, _, model in positions}, inputs=predict_inputs)
+        print(f"Gameweeks {gw_start}-{gw_end} completed!")
+
+        with self.report.stage('publish'):
+            self.publish(predicted, player_ids_names, season)
+        self.stage_log = graph.log
+        self.report.extra.update({'gameweeks': gws, 'stage_graph': graph.log, 'crawl': self.loader.crawl_stats})
+        print(f"Pipeline completed, run report {self.report.write()}")
+        return
 
-        # history = pd.read_csv('all_players_neeew.csv') 
-        history.to_csv("all_players_neeew.csv",index=False)
-        history.drop(columns=['id'], inplace=True)
+    def fixtures_stage(self):
+        fixtures = self.loader.load_data_api('https://fantasy.premierleague.com/api/fixtures/',None)
+        fixtures = self.preprocessor.fixtures_processing(fixtures)
+        self.history_store.write('fixtures', fixtures.drop(columns=['stats'], errors='ignore'))
+        return fixtures
 
+    def preprocess_stage(self, player_stats, history):
+        history = history.drop(columns=['id'])
         player_stats = pd.merge(player_stats, history, left_on="id", right_on="element", how="inner")
         df,goalkeepers,defenders,midfielders,forwards = self.preprocessor.divide_by_position(player_stats)
-        self.full_players = df
-
-        self.team_stats = self.preprocessor.teams_processing(self.team_stats)
-
-        # Initialize dictionaries to store predictions for each position across all gameweeks
-        all_gk_predictions = {}
-        all_def_predictions = {}
-        all_mid_predictions = {}
-        all_fwd_predictions = {}
-
-        for gw in range(gw_start, gw_end + 1):
-            print(f"Processing gameweek {gw}...")
-            
-            # Get predictions for all positions
-            predicted_goalkeepers = self.train_goalkeepers(goalkeepers, gw)
-            predicted_defenders = self.train_outfielders(defenders, gw, True)
-            predicted_midfielders = self.train_outfielders(midfielders, gw, False)
-            predicted_forwards = self.train_outfielders(forwards, gw, False)
-
-            # Store predictions with gameweek as column name
-            all_gk_predictions[f'gw_{gw}'] = predicted_goalkeepers[['player_id', 'predicted_points']]
-            all_def_predictions[f'gw_{gw}'] = predicted_defenders[['player_id', 'predicted_points']]
-            all_mid_predictions[f'gw_{gw}'] = predicted_midfielders[['player_id', 'predicted_points']]
-            all_fwd_predictions[f'gw_{gw}'] = predicted_forwards[['player_id', 'predicted_points']]
-
-            print(f"Gameweek {gw} completed!")
-        
-        # Create final dataframes for each position
-        positions = [
-            ('goalkeepers', all_gk_predictions),
-            ('defenders', all_def_predictions), 
-            ('midfielders', all_mid_predictions),
-            ('forwards', all_fwd_predictions)
-        ]
-        
-        # Dictionary to store the final dataframes
-        position_dataframes = {}
-        
-        for position_name, predictions_dict in positions:
-            if predictions_dict:
-                # Start with the first gameweek data
-                first_gw = list(predictions_dict.keys())[0]
-                final_df = predictions_dict[first_gw].copy()
-                final_df = final_df.rename(columns={'predicted_points': first_gw})
-                
-                # Add subsequent gameweeks
-                for gw_key in list(predictions_dict.keys())[1:]:
-                    gw_data = predictions_dict[gw_key]
-                    final_df = final_df.merge(
-                        gw_data.rename(columns={'predicted_points': gw_key}), 
-                        on=['player_id'], 
-                        how='outer'
-                    )
-                
-                # Calculate total points (sum of all gameweek columns)
-                gw_columns = [col for col in final_df.columns if col.startswith('gw_')]
-                final_df['total_points'] = final_df[gw_columns].sum(axis=1).round(2)
-                
-                final_df = pd.merge(player_ids_names, final_df, left_on="id_x", right_on="player_id", how="inner")
-                final_df = final_df.sort_values(by='total_points', ascending=False)
-
-                # Save to CSV and store in dictionary
-                final_df.to_csv(f"{output_dir}/{position_name}.csv", index=False)
-                position_dataframes[position_name] = final_df
-            
-        print(f"Pipeline completed")
-        return
-
-    
+        frames = {'goalkeepers': goalkeepers, 'defenders': defenders, 'midfielders': midfielders, 'forwards': forwards}
+        return df, frames, self.preprocessor.teams_processing(self.team_stats)
+
+    def train_stage(self, graph, positions, matrices):
+        # Each position model is fitted once per run, a resumed position gets its fitted booster back from the checkpoint
+        keys = {name: graph.key(f'train-{name}', [f'features-{name}'], {'gw': self.finished_gw, 'search': model.search, 'update': model.update})
+                for name, _, model in positions}
+        pending = []
+        for name, _, model in positions:
+            fitted = graph.load(f'train-{name}', keys[name])
+            if fitted is None:
+                pending.append((name, model))
+            else:
+                model.model = fitted
+
+        start = time.perf_counter()
+        if self.cpu_budget is None:
+            for name, model in pending:
+                X, Y, rounds, _, _ = matrices[name]
+                model.train(X, Y, rounds=rounds)
+        elif pending:
+            fm.train_in_parallel([(model, *matrices[name][:3]) for name, model in pending], self.cpu_budget)
+        seconds = (time.perf_counter() - start) / max(len(pending), 1)
+        for name, model in pending:
+            graph.save(f'train-{name}', keys[name], model.model, seconds)
+
+    def publish(self, predicted, player_ids_names, season):
+        # one long typed table for every position, range totals come from its per-player running sums
+        self.predictions = pt.PredictionTable.from_predictions(list(predicted.items()))
+        self.predictions.write(f"{output_dir}/predictions.parquet")
+
+        if season:
+            self.season_projections = self.predictions.wide()
+            self.season_projections.to_csv(f"{output_dir}/season_projections.csv", index=False)
+
+        # the wide per-position csvs are pivoted from the long table
+        for position_name in ['goalkeepers', 'defenders', 'midfielders', 'forwards']:
+            final_df = pd.merge(player_ids_names, self.predictions.wide(position_name), left_on="id_x", right_on="player_id", how="inner")
+            final_df = final_df.sort_values(by='total_points', ascending=False)
+            final_df.to_csv(f"{output_dir}/{position_name}.csv", index=False)
@@ -1,35 +1,104 @@
 import numpy as np
+import pandas as pd
+
+TEAM_TOTAL_COLUMNS = ['goals_scored', 'goals_conceded', 'clean_sheets', 'saves']
+
+class TeamAggregates:
+    # everything the features need from the full player history, one groupby per data version
+    def __init__(self, full_df):
+        self.source = full_df
+        per_fixture = full_df.groupby(['team', 'fixture']).agg(
+            team_defensive_contribution=('defensive_contribution', 'sum'),
+            team_max_goals_conceded=('goals_conceded', 'max'),
+            **{col: (col, 'sum') for col in TEAM_TOTAL_COLUMNS})
+
+        # season totals per team are summed from the much smaller team x fixture frame
+        totals = per_fixture[TEAM_TOTAL_COLUMNS].groupby(level='team').sum()
+        self.team_totals = totals.rename_axis('opponent_team').reset_index()
+
+        # defensive contribution over goals conceded of the team in that fixture, one value per history row
+        efficiency = per_fixture['team_defensive_contribution'] / (per_fixture['team_max_goals_conceded'] + 1e-6)
+        rows = pd.MultiIndex.from_frame(full_df[['team', 'fixture']])
+        self.team_defense_efficiency = pd.Series(efficiency.reindex(rows).to_numpy(), index=full_df.index)
+
+        self._as_of = None
+
+    @property
+    def as_of(self):
+        if self._as_of is None:
+            self._as_of = AsOfAggregates(self.source, 'team', TEAM_TOTAL_COLUMNS)
+        return self._as_of
+
+    def opponent_totals(self, columns, names):
+        return self.team_totals[['opponent_team', *columns]].set_axis(['opponent_team', *names], axis=1)
+
+class AsOfAggregates:
+    # running totals per key (team or element) and round, totals strictly before any round are a single lookup
+    def __init__(self, full_df, key='team', columns=TEAM_TOTAL_COLUMNS):
+        self.columns = list(columns)
+        per_round = full_df.groupby([key, 'round'])[self.columns].sum()
+        self.keys = per_round.index.get_level_values(key).unique().sort_values()
+        self.max_round = int(per_round.index.get_level_values('round').max()) if len(per_round) > 0 else 0
+        grid = per_round.reindex(pd.MultiIndex.from_product([self.keys, range(1, self.max_round + 1)]), fill_value=0)
+        values = grid.to_numpy(dtype=float).reshape(len(self.keys), self.max_round, len(self.columns))
+        # cumulative[k, r] holds the totals of rounds 1..r, cumulative[k, 0] is all zeros
+        self.cumulative = np.zeros((len(self.keys), self.max_round + 1, len(self.columns)))
+        self.cumulative[:, 1:, :] = values.cumsum(axis=1)
+
+    def before(self, keys, rounds):
+        # totals of every round < rounds for each (key, round) pair, NaN for unknown keys like a left merge
+        positions = self.keys.get_indexer(np.asarray(keys))
+        cutoff = np.clip(np.asarray(rounds, dtype=int) - 1, 0, self.max_round)
+        if len(self.keys) == 0:
+            totals = np.full((len(positions), len(self.columns)), np.nan)
+        else:
+            totals = self.cumulative[np.maximum(positions, 0), cutoff]
+            totals[positions < 0] = np.nan
+        return pd.DataFrame(totals, columns=self.columns, index=getattr(keys, 'index', None))
+
+    def table(self, gw):
+        # per key totals as of the deadline of gameweek gw, for backtests
+        totals = self.before(self.keys, np.full(len(self.keys), gw))
+        return totals.set_axis(self.keys).rename_axis(self.keys.name).reset_index()
+
 class FeatureEngineering:
-    def __init__(self):
-        pass
+    def __init__(self, as_of=False):
+        # as_of uses opponent totals from the rounds before each training row instead of whole-season totals
+        self.as_of = as_of
+        self.team_aggregates = None
+
+    def aggregates(self, full_df):
+        # rebuilt only when the pipeline hands over a new history frame
+        if self.team_aggregates is None or self.team_aggregates.source is not full_df:
+            self.team_aggregates = TeamAggregates(full_df)
+        return self.team_aggregates
 
     def add_features(self,players,full_df,position,train): #goalkeeper = 1, defender = 2, mid/attacker = 3
+        aggregates = self.aggregates(full_df)
         players = self.all_positions_common(players)
         if position == 1:
-            players = self.goalkeepers_cross_features(players,full_df)
+            players = self.goalkeepers_cross_features(players,aggregates)
         else:
-            players = self.outfielders_cross_features(players,full_df)
+            players = self.outfielders_cross_features(players,aggregates)
         if train:
             if position == 1:
-                players = self.goalkeepers_train(players, full_df)
+                players = self.goalkeepers_train(players, aggregates)
             else:
-                players = self.outfielders_train(players, full_df)
+                players = self.outfielders_train(players, aggregates)
 
         return players
     
-    def goalkeepers_train (self,df,full_df):
+    def goalkeepers_train (self,df,aggregates):
         df['saves_per_goal_conceded'] = df['player_saves'] / (df['player_goals_conceded'] + 1)
         df['saves_per_match'] = df['player_saves'] / (df['player_starts'] + 1)
         df['clean_sheets_per_match'] = df['player_clean_sheets'] / (df['player_starts'] + 1)
         df['player_recoveries_per_match'] = df['player_recoveries'] / (df['player_starts'] + 1)
 
-        numerator = full_df.groupby(['team','fixture'])['defensive_contribution'].transform('sum')
-        denominator = full_df.groupby(['team','fixture'])['goals_conceded'].transform('max')
-        df['team_defense_efficiency'] = numerator / (denominator + 1e-6)
+        df['team_defense_efficiency'] = aggregates.team_defense_efficiency
 
         return df
     
-    def outfielders_train(self,df,full_df):
+    def outfielders_train(self,df,aggregates):
         df['clean_sheets_per_match'] = df['player_clean_sheets'] / (df['player_starts'] + 1)
         df['goals_per_match'] = df['player_goals_scored'] / (df['player_starts'] + 1)
         df['assists_per_match'] = df['player_assists'] / (df['player_starts'] + 1)
@@ -38,9 +107,7 @@ class FeatureEngineering:
         df['interceptions_per_match'] = df['player_clearances_blocks_interceptions'] / (df['player_starts'] + 1)
         df['DC_per_match'] = df['player_defensive_contribution'] / (df['player_starts'] + 1)
         
-        numerator = full_df.groupby(['team','fixture'])['defensive_contribution'].transform('sum')
-        denominator = full_df.groupby(['team','fixture'])['goals_conceded'].transform('max')
-        df['team_defense_efficiency'] = numerator / (denominator + 1e-6)
+        df['team_defense_efficiency'] = aggregates.team_defense_efficiency
 
         return df
     
@@ -72,39 +139,31 @@ class FeatureEngineering:
 
         return df
     
-    def goalkeepers_cross_features(self, df, full_df):
+    def goalkeepers_cross_features(self, df, aggregates):
         # Add attacking threat features for goalkeepers based on opponent teams
         
-        # Create a mapping of team to total goals scored by that team
-        team_goals_scored = full_df.groupby('team')['goals_scored'].sum().reset_index()
-        team_goals_scored.columns = ['opponent_team', 'opponent_team_total_goals']
-        
-        # Merge this information with the goalkeepers dataframe
-        df = df.merge(team_goals_scored, left_on='player_opponent_team', right_on='opponent_team', how='left')
-        
-        # Drop the temporary opponent_team column if it was created
-        if 'opponent_team' in df.columns:
-            df = df.drop('opponent_team', axis=1)
-        
-        return df
+        # Total goals scored by the opponent team
+        return self.join_opponent_totals(df, aggregates, ['goals_scored'], ['opponent_team_total_goals'])
     
-    def outfielders_cross_features(self, df, full_df):
+    def outfielders_cross_features(self, df, aggregates):
         # Add defensive performance features for outfielders based on opponent teams
         
-        # Create a mapping of team to maximum goals conceded and clean sheets by that team
-        team_defensive_stats = full_df.groupby('team').agg({
-            'goals_scored': 'sum',
-            'goals_conceded': 'sum',
-            'clean_sheets': 'sum',
-            'saves': 'sum'
-        }).reset_index()
-        team_defensive_stats.columns = ['opponent_team', 'opponent_team_total_goals_scored', 'opponent_team_total_goals_conceded','opponent_team_total_clean_sheets','opponent_team_total_saves']
-
-        # Merge this information with the outfielders dataframe
-        df = df.merge(team_defensive_stats, left_on='player_opponent_team', right_on='opponent_team', how='left')
-        
+        # Total goals scored, conceded, clean sheets and saves by the opponent team
+        return self.join_opponent_totals(df, aggregates, TEAM_TOTAL_COLUMNS, ['opponent_team_total_goals_scored', 'opponent_team_total_goals_conceded','opponent_team_total_clean_sheets','opponent_team_total_saves'])
+
+    def join_opponent_totals(self, df, aggregates, columns, names):
+        # prediction rows carry no round, all finished rounds lie before the gameweek they predict
+        if self.as_of and 'player_round' in df.columns:
+            df = df.reset_index(drop=True)
+            totals = aggregates.as_of.before(df['player_opponent_team'], df['player_round'])
+            df[names] = totals[columns].to_numpy()
+            return df
+
+        # Merge the season totals of the opponent team
+        df = df.merge(aggregates.opponent_totals(columns, names), left_on='player_opponent_team', right_on='opponent_team', how='left')
+
         # Drop the temporary opponent_team column if it was created
         if 'opponent_team' in df.columns:
             df = df.drop('opponent_team', axis=1)
-        
+
         return df
\ No newline at end of file
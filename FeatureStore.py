@@ -0,0 +1,72 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import pandas as pd
+
+store_dir = 'features'
+
+# bump when feature engineering changes in a way the input data does not show
+FEATURE_VERSION = 1
+
+class FeatureStore:
+    # final train/predict matrices per position: features/<position>/gw<NN>-<fingerprint>/{<name>.parquet,meta.json}
+    def __init__(self, path=store_dir, keep_versions=3):
+        self.path = path
+        self.keep_versions = keep_versions
+        os.makedirs(path, exist_ok=True)
+
+    def fingerprint(self, frames, extra=None):
+        # content hash of the raw inputs the matrices are built from, object columns are hashed as strings
+        digest = hashlib.sha256()
+        digest.update(json.dumps({'feature_version': FEATURE_VERSION, **(extra or {})}, sort_keys=True, default=str).encode())
+        for df in frames:
+            digest.update(json.dumps([str(c) for c in df.columns]).encode())
+            for col in df.columns:
+                values = df[col].astype(str) if df[col].dtype == object else df[col]
+                digest.update(pd.util.hash_pandas_object(values, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    def version_dir(self, position, gw, fingerprint):
+        return os.path.join(self.path, position, f"gw{gw:02d}-{fingerprint[:16]}")
+
+    def load_meta(self, position, gw, fingerprint):
+        meta_path = os.path.join(self.version_dir(position, gw, fingerprint), 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def load(self, position, gw, fingerprint, name):
+        meta = self.load_meta(position, gw, fingerprint)
+        if meta is None or name not in meta['columns']:
+            return None
+        version_dir = self.version_dir(position, gw, fingerprint)
+        df = pd.read_parquet(os.path.join(version_dir, f"{name}.parquet"), memory_map=True)
+        os.utime(version_dir)
+        return df[meta['columns'][name]]
+
+    def save(self, position, gw, fingerprint, name, df):
+        version_dir = self.version_dir(position, gw, fingerprint)
+        os.makedirs(version_dir, exist_ok=True)
+        df.to_parquet(os.path.join(version_dir, f"{name}.parquet"), index=False)
+
+        meta = self.load_meta(position, gw, fingerprint) or {'gw': gw, 'fingerprint': fingerprint, 'columns': {}}
+        meta['columns'][name] = [str(c) for c in df.columns]
+        meta['created_at'] = time.time()
+        with open(os.path.join(version_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        self.evict(position)
+
+    def versions(self, position):
+        position_dir = os.path.join(self.path, position)
+        if not os.path.isdir(position_dir):
+            return []
+        return [os.path.join(position_dir, d) for d in os.listdir(position_dir) if d.startswith('gw')]
+
+    def evict(self, position):
+        # keep the most recently used data versions of each position
+        versions = sorted(self.versions(position), key=os.path.getmtime, reverse=True)
+        for old in versions[self.keep_versions:]:
+            shutil.rmtree(old)
@@ -0,0 +1,145 @@
+import os
+import shutil
+import pandas as pd
+
+store_dir = 'data'
+
+# consecutive rounds share one parquet file, a changed round rewrites only the file it falls in
+ROUNDS_PER_FILE = 10
+
+# explicit dtypes for everything the pipeline persists, columns missing from a frame are skipped
+HISTORY_SCHEMA = {
+    'element': 'int32', 'fixture': 'int16', 'opponent_team': 'category', 'total_points': 'int16',
+    'was_home': 'bool', 'team_h_score': 'Int8', 'team_a_score': 'Int8', 'round': 'int8', 'modified': 'bool',
+    'minutes': 'int16', 'goals_scored': 'int8', 'assists': 'int8', 'clean_sheets': 'int8', 'goals_conceded': 'int8',
+    'own_goals': 'int8', 'penalties_saved': 'int8', 'penalties_missed': 'int8', 'yellow_cards': 'int8',
+    'red_cards': 'int8', 'saves': 'int8', 'bonus': 'int8', 'bps': 'int16',
+    'influence': 'float32', 'creativity': 'float32', 'threat': 'float32', 'ict_index': 'float32',
+    'clearances_blocks_interceptions': 'int16', 'recoveries': 'int16', 'tackles': 'int16',
+    'defensive_contribution': 'int16', 'starts': 'int8',
+    'expected_goals': 'float32', 'expected_assists': 'float32', 'expected_goal_involvements': 'float32',
+    'expected_goals_conceded': 'float32', 'value': 'int16', 'transfers_balance': 'int32', 'selected': 'int32',
+    'transfers_in': 'int32', 'transfers_out': 'int32', 'id': 'int32', 'avg_points_last_3y': 'float32',
+}
+
+FIXTURES_SCHEMA = {
+    'code': 'int32', 'event': 'Int8', 'finished': 'bool', 'id': 'int16', 'team_a': 'category', 'team_h': 'category',
+    'team_h_difficulty': 'int8', 'team_a_difficulty': 'int8', 'pulse_id': 'int32',
+}
+
+TEAMS_SCHEMA = {
+    'id': 'int8', 'name': 'category', 'short_name': 'category', 'position': 'int8',
+    'strength': 'int8', 'strength_overall_home': 'int16', 'strength_overall_away': 'int16',
+    'strength_attack_home': 'int16', 'strength_attack_away': 'int16',
+    'strength_defence_home': 'int16', 'strength_defence_away': 'int16',
+}
+
+SCHEMAS = {'history': HISTORY_SCHEMA, 'fixtures': FIXTURES_SCHEMA, 'teams': TEAMS_SCHEMA}
+
+class HistoryStore:
+    def __init__(self, path=store_dir):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def table_path(self, name):
+        return os.path.join(self.path, name)
+
+    def exists(self, name):
+        return os.path.exists(self.table_path(name))
+
+    def apply_schema(self, df, name):
+        schema = SCHEMAS.get(name, {})
+        for col, dtype in schema.items():
+            if col not in df.columns:
+                continue
+            if dtype == 'category':
+                df[col] = df[col].astype('category')
+            elif dtype == 'bool':
+                df[col] = df[col].astype(str).str.lower().eq('true') if df[col].dtype == object else df[col].astype(bool)
+            else:
+                # partition columns come back as dictionaries, api decimals as strings
+                if isinstance(df[col].dtype, pd.CategoricalDtype) or df[col].dtype == object:
+                    df[col] = pd.to_numeric(df[col].astype(str), errors='coerce')
+                if not dtype[0].isupper():
+                    df[col] = df[col].fillna(0)
+                df[col] = df[col].astype(dtype)
+        if 'kickoff_time' in df.columns:
+            df['kickoff_time'] = pd.to_datetime(df['kickoff_time'], utc=True)
+        return df
+
+    def write(self, name, df, partition_col=None):
+        # rewrites the whole table, history is split into files of ROUNDS_PER_FILE rounds
+        path = self.table_path(name)
+        if os.path.exists(path):
+            shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+        if partition_col is None:
+            self.apply_schema(df.copy(), name).to_parquet(path, index=False)
+        else:
+            self.write_partitions(name, df, partition_col)
+
+    def block_path(self, name, block, partition_col='round'):
+        first = block * ROUNDS_PER_FILE + 1
+        return os.path.join(self.table_path(name), f"{partition_col}-{first:02d}-{first + ROUNDS_PER_FILE - 1:02d}.parquet")
+
+    def blocks(self, values):
+        return (pd.Series(values).astype(int) - 1) // ROUNDS_PER_FILE
+
+    def write_block(self, name, block, df, partition_col='round'):
+        # the schema is applied here, once, so reads need no casting; the round column stays in the file
+        path = self.block_path(name, block, partition_col)
+        if len(df) == 0:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        df = self.apply_schema(df.copy(), name).sort_values(partition_col, kind='stable')
+        df.to_parquet(path, index=False)
+
+    def write_partitions(self, name, df, partition_col='round'):
+        # replaces only the rounds present in df, the other rounds of the files they fall in are kept
+        self.upgrade(name, partition_col)
+        os.makedirs(self.table_path(name), exist_ok=True)
+        df = self.apply_schema(df.copy(), name)
+        for block, part in df.groupby(self.blocks(df[partition_col]).to_numpy()):
+            path = self.block_path(name, block, partition_col)
+            if os.path.exists(path):
+                kept = pd.read_parquet(path)
+                part = pd.concat([kept[~kept[partition_col].isin(part[partition_col].unique())], part], ignore_index=True)
+            self.write_block(name, block, part, partition_col)
+
+    def delete_partitions(self, name, values, partition_col='round'):
+        self.upgrade(name, partition_col)
+        for block in self.blocks(values).unique():
+            path = self.block_path(name, block, partition_col)
+            if os.path.exists(path):
+                kept = pd.read_parquet(path)
+                self.write_block(name, block, kept[~kept[partition_col].isin(values)], partition_col)
+
+    def upgrade(self, name, partition_col='round'):
+        # stores written with one directory per round are coalesced into round files once
+        path = self.table_path(name)
+        if not os.path.isdir(path) or not any(d.startswith(f"{partition_col}=") for d in os.listdir(path)):
+            return
+        df = self.apply_schema(pd.read_parquet(path), name)
+        shutil.rmtree(path)
+        self.write_partitions(name, df, partition_col)
+
+    def read(self, name, columns=None, filters=None, categoricals=True):
+        # the files already carry the schema's dtypes, memory_map avoids an extra copy of the file and
+        # filters skip the round files and row groups that cannot match
+        self.upgrade(name)
+        df = pd.read_parquet(self.table_path(name), columns=columns, filters=filters, memory_map=True, partitioning=None)
+        if not categoricals:
+            # the model and the team joins need plain integers back
+            for col in df.columns:
+                if isinstance(df[col].dtype, pd.CategoricalDtype) and pd.api.types.is_numeric_dtype(df[col].cat.categories):
+                    df[col] = df[col].astype(df[col].cat.categories.dtype)
+        return df
+
+    def rounds(self, name='history', partition_col='round'):
+        path = self.table_path(name)
+        if not os.path.isdir(path):
+            return []
+        self.upgrade(name, partition_col)
+        if not os.listdir(path):
+            return []
+        return sorted(int(r) for r in pd.read_parquet(path, columns=[partition_col], partitioning=None)[partition_col].unique())
@@ -0,0 +1,116 @@
+import time
+import random
+import threading
+from collections import deque
+from itertools import islice
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# (connect, read) timeouts in seconds per endpoint, matched on the url
+DEFAULT_TIMEOUTS = {
+    'bootstrap-static': (5, 30),
+    'fixtures': (5, 20),
+    'element-summary': (5, 10),
+    'fbref.com': (10, 60),
+}
+DEFAULT_TIMEOUT = (5, 15)
+# latencies kept for stage statistics, older requests still count towards requests and bytes
+LATENCY_WINDOW = 4096
+
+class HttpSession:
+    # one keep-alive connection pool per process, shared by every DataLoader
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, pool_connections=10, pool_maxsize=32, max_retries=4, backoff_base=0.5, backoff_max=30, timeouts=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.retries = 0
+        # request count, body size and the latest latencies, read by RunReport to attribute traffic to pipeline stages;
+        # the session lives as long as the process (streamlit included), so only the last LATENCY_WINDOW latencies are kept
+        self.count = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.bytes = 0
+        self.stats_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def timeout(self, url):
+        for key, timeout in self.timeouts.items():
+            if key in url:
+                return timeout
+        return DEFAULT_TIMEOUT
+
+    def backoff(self, attempt, response=None):
+        # honour Retry-After on 429, otherwise exponential backoff with full jitter
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return min(float(response.headers['Retry-After']), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url, headers=None):
+        start = time.perf_counter()
+        response = self.get_with_retries(url, headers)
+        size = len(response.content)
+        with self.stats_lock:
+            self.latencies.append(time.perf_counter() - start)
+            self.count += 1
+            self.bytes += size
+        return response
+
+    def get_with_retries(self, url, headers=None):
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout(url))
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+                self.retries += 1
+                time.sleep(self.backoff(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                self.retries += 1
+                time.sleep(self.backoff(attempt, response))
+                continue
+            return response
+
+    def http_stats(self):
+        with self.stats_lock:
+            return {'count': self.count, 'bytes': self.bytes, 'retries': self.retries}
+
+    def latencies_since(self, count):
+        # latencies of the requests made after http_stats() returned `count`, as far back as the window reaches
+        with self.stats_lock:
+            n = min(self.count - count, len(self.latencies))
+            return list(islice(self.latencies, len(self.latencies) - n, None)) if n > 0 else []
+
+    def connection_stats(self):
+        # urllib3 counts requests and newly opened connections per host pool, the difference was served by keep-alive
+        requests_made = 0
+        connections = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                requests_made += pool.num_requests
+                connections += pool.num_connections
+        return {
+            'requests': requests_made,
+            'new_connections': connections,
+            'reused_connections': requests_made - connections,
+            'retries': self.retries,
+        }
@@ -1,16 +1,24 @@
 from unittest import loader
 from numpy import info
 import pandas as pd
+import BootstrapSnapshot as bs
+import RunReport as rr
 
 
 class LiveStats:
     def __init__(self,loader,preprocessor):
         self.loader = loader
         self.preprocessor = preprocessor
+        # get_team_info is also called on its own by the web app, its stages are only written out by run()
+        self.report = rr.RunReport('live_stats', loader.session)
     
     def get_team_info(self, url, gw):
+        with self.report.stage('team_info'):
+            return self.team_info(url, gw)
+
+    def team_info(self, url, gw):
         gw -= 1
-        total_players = self.loader.load_data_api("https://fantasy.premierleague.com/api/bootstrap-static/",'elements')
+        total_players = bs.BootstrapSnapshot.shared(self.loader, max_age=3600).elements
         total_players= total_players[['id', 'web_name','team','selected_by_percent','transfers_in_event','transfers_out_event']]
         
         df = self.loader.load_data_api(url,'picks')
@@ -20,7 +28,6 @@ class LiveStats:
         for player_id in player_ids:
             player_history_url = f"https://fantasy.premierleague.com/api/element-summary/{player_id}/"
             history = self.loader.load_data_api(player_history_url, 'history')
-            print(history)
             if 0 <= gw < len(history):
                 event_points = history.iloc[gw]['total_points']
             else:
@@ -66,25 +73,30 @@ class LiveStats:
         
         return names, name_id_dict
     
-    def run(self, team_id):
-        deadlines = self.loader.load_data_api('https://fantasy.premierleague.com/api/bootstrap-static/','events')
-        self.finished_gw = self.preprocessor.get_current_gw(deadlines) - 1
+    def run(self, team_id, write_report=True):
+        self.report = rr.RunReport('live_stats', self.loader.session)
+        with self.report.stage('bootstrap'):
+            bootstrap = bs.BootstrapSnapshot.shared(self.loader, max_age=3600)
+            self.finished_gw = bootstrap.get_current_gw() - 1
         # get team picks for the last finished gw
         url1 = f"https://fantasy.premierleague.com/api/entry/{team_id}/"
         url2 = f"https://fantasy.premierleague.com/api/entry/{team_id}/event/{self.finished_gw}/picks/"
         # url2 = f"https://fantasy.premierleague.com/api/entry/{team_id}/event/15/picks/"
-        self.info = self.loader.load_live_team(url1) 
+        with self.report.stage('entry'):
+            self.info = self.loader.load_live_team(url1) 
         # print(self.info["player_name"])
 
-        self.team_entry_history = self.loader.load_data_api(url2, 'entry_history')
-        team_value = (self.team_entry_history['value']*1.0 / 10.0).iloc[0]
-        # print("value " + str(team_value))
+        with self.report.stage('picks'):
+            self.team_entry_history = self.loader.load_data_api(url2, 'entry_history')
+            team_value = (self.team_entry_history['value']*1.0 / 10.0).iloc[0]
+            # print("value " + str(team_value))
         
-        self.team_picks = self.loader.load_data_api(url2, 'picks')
-        players = self.loader.load_data_api("https://fantasy.premierleague.com/api/bootstrap-static/",'elements')
-        player_ids_names = players.copy()
-        self.players_stats = player_ids_names[['id', 'web_name','team','event_points','selected_by_percent','transfers_in_event','transfers_out_event']]
-        self.team_picks = self.team_picks.merge(self.players_stats, left_on='element', right_on='id', how='left')
+            self.team_picks = self.loader.load_data_api(url2, 'picks')
+            players = bootstrap.elements
+            player_ids_names = players.copy()
+            self.players_stats = player_ids_names[['id', 'web_name','team','event_points','selected_by_percent','transfers_in_event','transfers_out_event']]
+            self.team_picks = self.team_picks.merge(self.players_stats, left_on='element', right_on='id', how='left')
         # print(f"Team Picks for GW{self.finished_gw}: ")
         # print(self.team_picks)
-    
\ No newline at end of file
+        if write_report:
+            print(f"Run report {self.report.write()}")
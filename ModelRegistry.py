@@ -0,0 +1,68 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import pandas as pd
+import xgboost as xgb
+
+registry_dir = 'models'
+
+class ModelRegistry:
+    # every save of a position model becomes a new version directory: models/<name>/v0001/{model.json,meta.json}
+    def __init__(self, path=registry_dir, keep_versions=5):
+        self.path = path
+        self.keep_versions = keep_versions
+        os.makedirs(path, exist_ok=True)
+
+    def fingerprint(self, X, y):
+        # content hash of the training matrix, column names and order included
+        digest = hashlib.sha256()
+        digest.update(json.dumps([str(c) for c in X.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(X, index=False).values.tobytes())
+        digest.update(pd.util.hash_pandas_object(pd.Series(y), index=False).values.tobytes())
+        return digest.hexdigest()
+
+    def versions(self, name):
+        model_dir = os.path.join(self.path, name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(d for d in os.listdir(model_dir) if d.startswith('v'))
+
+    def load_meta(self, name):
+        versions = self.versions(name)
+        if not versions:
+            return None
+        with open(os.path.join(self.path, name, versions[-1], 'meta.json')) as f:
+            meta = json.load(f)
+        meta['version'] = versions[-1]
+        return meta
+
+    def load_model(self, name, meta=None):
+        meta = meta if meta is not None else self.load_meta(name)
+        if meta is None:
+            return None
+        model = xgb.XGBRegressor()
+        model.load_model(os.path.join(self.path, name, meta['version'], 'model.json'))
+        return model
+
+    def save(self, name, model, best_params, fingerprint, data_gw=None, extra=None):
+        versions = self.versions(name)
+        version = f"v{int(versions[-1][1:]) + 1:04d}" if versions else 'v0001'
+        version_dir = os.path.join(self.path, name, version)
+        os.makedirs(version_dir)
+        model.save_model(os.path.join(version_dir, 'model.json'))
+        meta = {
+            'fingerprint': fingerprint,
+            'features': [str(c) for c in model.feature_names_in_],
+            'best_params': best_params,
+            'data_gw': data_gw,
+            'created_at': time.time(),
+            **(extra or {}),
+        }
+        with open(os.path.join(version_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        for old in self.versions(name)[:-self.keep_versions]:
+            shutil.rmtree(os.path.join(self.path, name, old))
+        return version
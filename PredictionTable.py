@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pandas as pd
+
+predictions_file = 'predictions/predictions.parquet'
+
+# one row per player and fixture, double gameweeks give two rows for the same gw
+SCHEMA = {'player_id': 'int32', 'position': 'category', 'gw': 'int8', 'fixture_id': 'int16',
+          'predicted_points': 'float32', 'cum_points': 'float32'}
+
+class PredictionTable:
+    def __init__(self, df):
+        self.df = df
+        self._prefix = None
+
+    @classmethod
+    def from_predictions(cls, predictions):
+        # predictions is a list of (position, frame with player_id, gw, fixture_id, predicted_points)
+        df = pd.concat([frame.assign(position=name) for name, frame in predictions], ignore_index=True)
+        df = df.sort_values(['player_id', 'gw', 'fixture_id']).reset_index(drop=True)
+        # running total per player over the gameweeks, any range total is a difference of two values
+        df['cum_points'] = df.groupby('player_id')['predicted_points'].cumsum()
+        return cls(df[list(SCHEMA)].astype(SCHEMA))
+
+    @classmethod
+    def read(cls, path=predictions_file):
+        return cls(pd.read_parquet(path).astype(SCHEMA))
+
+    def write(self, path=predictions_file):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.df.to_parquet(path, index=False)
+
+    @property
+    def gws(self):
+        return np.arange(self.df['gw'].min(), self.df['gw'].max() + 1)
+
+    def prefix(self):
+        # players x (gws + 1) matrix of the running totals, column 0 is the total before the first gameweek
+        if self._prefix is None:
+            last = self.df.groupby(['player_id', 'gw'], observed=True)['cum_points'].last()
+            dense = last.unstack('gw').reindex(columns=self.gws).ffill(axis=1).fillna(0)
+            self._prefix = dense.reindex(columns=[self.gws[0] - 1, *self.gws], fill_value=0)
+        return self._prefix
+
+    def range_totals(self, start_gw, end_gw):
+        # predicted points per player for start_gw..end_gw, O(1) per player once prefix() is built
+        prefix = self.prefix()
+        first, last = prefix.columns[0], prefix.columns[-1]
+        end = min(max(end_gw, first), last)
+        start = min(max(start_gw - 1, first), last)
+        return (prefix[end] - prefix[start]).round(2).rename('total_points')
+
+    def points_per_gw(self, position=None):
+        df = self.df if position is None else self.df[self.df['position'] == position]
+        return df.groupby(['player_id', 'position', 'gw'], as_index=False, observed=True)['predicted_points'].sum()
+
+    def wide(self, position=None):
+        # the gw_<n> column layout of the csv outputs, blank gameweeks are 0
+        per_gw = self.points_per_gw(position)
+        table = per_gw.pivot_table(index=['player_id', 'position'], columns='gw', values='predicted_points', fill_value=0, observed=True)
+        table.columns = [f'gw_{gw}' for gw in table.columns]
+        table = table.reset_index()
+        table['total_points'] = table['player_id'].map(self.range_totals(self.gws[0], self.gws[-1]))
+        if position is not None:
+            table = table.drop(columns=['position'])
+        return table.sort_values(by='total_points', ascending=False)
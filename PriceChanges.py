@@ -1,16 +1,24 @@
 import datetime
+import BootstrapSnapshot as bs
+import RunReport as rr
 
 class PriceChanges:
-    def __init__(self,loader,preprocessor):
+    def __init__(self,loader,preprocessor,profiler=None):
         self.loader = loader
         self.preprocessor = preprocessor
+        self.report = None
+        self.profiler = profiler
 
     def run(self):
-        players = self.loader.load_data_api("https://fantasy.premierleague.com/api/bootstrap-static/",'elements')
+        self.report = rr.RunReport('price_changes', self.loader.session, profiler=self.profiler)
+        with self.report.stage('bootstrap'):
+            players = bs.BootstrapSnapshot.shared(self.loader).elements
         
-        players['net_transfers'] = players['transfers_in_event'] - players['transfers_out_event']
-        players['selected_by_percent'] = players['selected_by_percent'].astype(float) / 100.0
-        players['timestamp'] = datetime.datetime.now()
-        players.to_csv("fpl_snapshots.csv", mode='a', index=False)
+        with self.report.stage('snapshot'):
+            players['net_transfers'] = players['transfers_in_event'] - players['transfers_out_event']
+            players['selected_by_percent'] = players['selected_by_percent'].astype(float) / 100.0
+            players['timestamp'] = datetime.datetime.now()
+            players.to_csv("fpl_snapshots.csv", mode='a', index=False)
+        print(f"Run report {self.report.write()}")
 
         
\ No newline at end of file
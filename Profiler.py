@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+profile_dir = 'profiles'
+PROFILE_ENV = 'FPL_PROFILE'
+
+class StackSampler:
+    # samples the python stack of every thread from a background thread, in the collapsed stack format
+    # that speedscope and flamegraph.pl read
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.sample, name='stack-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def sample(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class StageProfiler:
+    # opt-in: --profile on the command line or FPL_PROFILE=<dir> in the environment, off means no sampler thread at all
+    def __init__(self, path=profile_dir, interval=0.005):
+        self.path = path
+        self.interval = interval
+        self.count = 0
+
+    @classmethod
+    def from_args(cls, argv=None, environ=None):
+        argv = sys.argv if argv is None else argv
+        environ = os.environ if environ is None else environ
+        value = environ.get(PROFILE_ENV, '')
+        if '--profile' not in argv and value in ('', '0'):
+            return None
+        return cls(value if value not in ('', '1') else profile_dir)
+
+    @contextmanager
+    def profile(self, run, stage):
+        # profiles/<run>/<NN>-<stage>.collapsed, numbered in the order the stages ran
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            self.count += 1
+            run_dir = os.path.join(self.path, run)
+            os.makedirs(run_dir, exist_ok=True)
+            sampler.write(os.path.join(run_dir, f"{self.count:02d}-{stage}.collapsed"))
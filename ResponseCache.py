@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+
+# families whose cached responses are revalidated once a new gameweek is finalised (bonus points land late)
+FINALISATION_FAMILIES = ['element-summary']
+
+# seconds a response stays fresh per endpoint family, None means it never expires
+DEFAULT_TTLS = {
+    'bootstrap-static': 300,
+    'fixtures': 3600,
+    'element-summary': 3600,
+    'entry-picks': 60,
+    'entry': 60,
+}
+
+ENDPOINT_FAMILIES = [
+    ('bootstrap-static', re.compile(r'/api/bootstrap-static/')),
+    ('fixtures', re.compile(r'/api/fixtures/')),
+    ('element-summary', re.compile(r'/api/element-summary/\d+/')),
+    ('entry-picks', re.compile(r'/api/entry/\d+/event/(\d+)/picks/')),
+    ('entry', re.compile(r'/api/entry/\d+/$')),
+]
+
+class ResponseCache:
+    def __init__(self, cache_dir='cache', max_bytes=200 * 1024 * 1024, ttls=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        # picks of gameweeks up to this one are final and cached for good, set from bootstrap-static events
+        self.finalised_gw = 0
+        # responses of FINALISATION_FAMILIES fetched before this time are stale, kept on disk across processes
+        self.finalised_at = 0.0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.load_finalisation()
+        self.total_bytes = sum(size for _, size, _ in self.entries())
+
+    def marker_path(self):
+        return os.path.join(self.cache_dir, 'finalised_gw.marker')
+
+    def load_finalisation(self):
+        try:
+            with open(self.marker_path()) as f:
+                marker = json.load(f)
+            self.finalised_gw, self.finalised_at = marker['gw'], marker['at']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def set_finalised_gw(self, gw):
+        # a gameweek moving to finalised invalidates summaries cached while its data was still provisional
+        with self.lock:
+            if gw == self.finalised_gw:
+                return
+            self.finalised_gw, self.finalised_at = gw, time.time()
+            with open(self.marker_path(), 'w') as f:
+                json.dump({'gw': gw, 'at': self.finalised_at}, f)
+
+    def family(self, url):
+        for name, pattern in ENDPOINT_FAMILIES:
+            match = pattern.search(url)
+            if match:
+                return name, match
+        return None, None
+
+    def ttl(self, url):
+        # returns (cacheable, ttl)
+        name, match = self.family(url)
+        if name is None:
+            return False, 0
+        if name == 'entry-picks' and int(match.group(1)) <= self.finalised_gw:
+            return True, None
+        return True, self.ttls[name]
+
+    def path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode()).hexdigest() + '.json')
+
+    def get(self, url):
+        path = self.path(url)
+        with self.lock:
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+            # mtime doubles as the last access time for lru eviction
+            os.utime(path)
+        return entry
+
+    def is_fresh(self, entry, ttl):
+        if ttl is None or entry.get('permanent'):
+            return True
+        name, _ = self.family(entry.get('url', ''))
+        if name in FINALISATION_FAMILIES and entry['fetched_at'] < self.finalised_at:
+            return False
+        return time.time() - entry['fetched_at'] < ttl
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, body, response_headers, ttl):
+        entry = {
+            'url': url,
+            'fetched_at': time.time(),
+            'permanent': ttl is None,
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'body': body,
+        }
+        path = self.path(url)
+        with self.lock:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self.total_bytes += os.path.getsize(path) - old_size
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+        return entry
+
+    def touch(self, url, entry, ttl):
+        # a 304 answer renews the entry without downloading the body again
+        entry['fetched_at'] = time.time()
+        entry['permanent'] = ttl is None
+        path = self.path(url)
+        with self.lock:
+            with open(path, 'w') as f:
+                json.dump(entry, f)
+
+    def entries(self):
+        # (last access, size, path) for every cached response
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def evict(self):
+        # drop least recently used entries until the cache fits in max_bytes again
+        files = sorted(self.entries())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self.total_bytes = total
+
+    def clear(self):
+        with self.lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.cache_dir, name))
+            self.total_bytes = 0
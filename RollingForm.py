@@ -0,0 +1,8 @@
+import pandas as pd
+
+def last_form(df, columns, window=5, key='player_id', decimals=3):
+    # mean of every column over each player's last `window` rows in frame order, NaNs skipped like pandas rolling,
+    # one row per player sorted by key
+    recent = df.groupby(key, sort=False).tail(window)
+    means = recent[columns].astype(float).groupby(recent[key].to_numpy()).mean()
+    return means.round(decimals).rename_axis(key).reset_index()
@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+try:
+    import resource
+except ImportError:  # windows has no getrusage, peak rss is reported as None there
+    resource = None
+
+report_dir = 'reports'
+
+def rusage():
+    # (cpu seconds of this process and its finished children, peak rss in MiB)
+    if resource is None:
+        return time.process_time(), None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is KiB on linux and bytes on macos
+    scale = 2**20 if sys.platform == 'darwin' else 2**10
+    peak = max(own.ru_maxrss, children.ru_maxrss) / scale
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime, peak
+
+class RunReport:
+    # wall time, cpu time, peak rss and http traffic per stage of one pipeline run, written as json
+    def __init__(self, pipeline, session=None, path=report_dir, profiler=None):
+        self.pipeline = pipeline
+        self.session = session
+        self.path = path
+        # an optional Profiler.StageProfiler, every stage is then sampled into its own flamegraph file
+        self.profiler = profiler
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.stages = []
+        self.extra = {}
+
+    @contextmanager
+    def stage(self, name):
+        if self.profiler is None:
+            with self.measure(name):
+                yield
+        else:
+            with self.measure(name), self.profiler.profile(self.run_id, name):
+                yield
+
+    @property
+    def run_id(self):
+        return f"{self.pipeline}-{self.started_at.strftime('%Y%m%dT%H%M%SZ')}"
+
+    @contextmanager
+    def measure(self, name):
+        http_before = self.session.http_stats() if self.session is not None else None
+        cpu_before, rss_before = rusage()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cpu_after, rss_after = rusage()
+            entry = {
+                'stage': name,
+                'wall_s': round(time.perf_counter() - start, 4),
+                'cpu_s': round(cpu_after - cpu_before, 4),
+                'peak_rss_mb': round(rss_after, 1) if rss_after is not None else None,
+                'peak_rss_growth_mb': round(rss_after - rss_before, 1) if rss_after is not None else None,
+            }
+            if http_before is not None:
+                entry.update(self.http_delta(http_before, self.session.http_stats()))
+            self.stages.append(entry)
+
+    def http_delta(self, before, after):
+        latencies = sorted(self.session.latencies_since(before['count']))
+        n = len(latencies)
+        return {
+            'http_requests': after['count'] - before['count'],
+            'http_bytes': after['bytes'] - before['bytes'],
+            'http_retries': after['retries'] - before['retries'],
+            'http_latency_mean_s': round(sum(latencies) / n, 4) if n else 0.0,
+            'http_latency_p95_s': round(latencies[min(n - 1, int(0.95 * n))], 4) if n else 0.0,
+            'http_latency_max_s': round(latencies[-1], 4) if n else 0.0,
+        }
+
+    def summary(self):
+        _, peak = rusage()
+        return {
+            'pipeline': self.pipeline,
+            'started_at': self.started_at.isoformat(),
+            'wall_s': round(time.perf_counter() - self.start, 4),
+            'cpu_s': round(sum(s['cpu_s'] for s in self.stages), 4),
+            'peak_rss_mb': round(peak, 1) if peak is not None else None,
+            'http_requests': sum(s.get('http_requests', 0) for s in self.stages),
+            'http_bytes': sum(s.get('http_bytes', 0) for s in self.stages),
+            'stages': self.stages,
+            **self.extra,
+        }
+
+    def write(self):
+        # reports/<pipeline>-<utc timestamp>.json, one file per run so weekly runs can be compared
+        os.makedirs(self.path, exist_ok=True)
+        report_path = os.path.join(self.path, f"{self.run_id}.json")
+        with open(report_path, 'w') as f:
+            json.dump(self.summary(), f, indent=2, default=str)
+        return report_path
@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import pandas as pd
+from contextlib import nullcontext
+
+checkpoint_dir = 'checkpoints'
+
+def content_key(*values):
+    # sha256 over frames, series and plain json values, object columns are hashed as strings
+    digest = hashlib.sha256()
+    for value in values:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            df = value.to_frame() if isinstance(value, pd.Series) else value
+            digest.update(json.dumps([str(c) for c in df.columns]).encode())
+            for col in df.columns:
+                column = df[col].astype(str) if df[col].dtype == object else df[col]
+                digest.update(pd.util.hash_pandas_object(column, index=False).values.tobytes())
+        elif isinstance(value, (list, tuple)):
+            digest.update(content_key(*value).encode())
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+class StageGraph:
+    # content-addressed stage checkpoints: checkpoints/<stage>/<key>.pkl, the key hashes the stage name, its params and
+    # the keys of the stages it reads, so a stage is only skipped when everything upstream is unchanged
+    def __init__(self, path=checkpoint_dir, resume=False, keep_versions=2):
+        self.path = path
+        self.resume = resume
+        self.keep_versions = keep_versions
+        self.keys = {}
+        self.log = []
+        # an optional RunReport that records every stage that runs
+        self.report = None
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def checkpoint_path(self, name, key):
+        return os.path.join(self.path, name, f"{key[:24]}.pkl")
+
+    def source(self, name, fn, key_of=None):
+        # stages that read the outside world always run, their key is the content they returned,
+        # or the part of it that key_of picks when the rest changes without affecting later stages
+        start = time.perf_counter()
+        with self.timed(name):
+            result = fn()
+        self.keys[name] = content_key(name, result if key_of is None else key_of(result))
+        self.log.append({'stage': name, 'key': self.keys[name][:24], 'status': 'ran', 'seconds': time.perf_counter() - start})
+        return result
+
+    def timed(self, name):
+        return self.report.stage(name) if self.report is not None else nullcontext()
+
+    def key(self, name, inputs=(), params=None):
+        return content_key(name, [self.keys[i] for i in inputs], params)
+
+    def load(self, name, key):
+        # None when the stage has to run
+        if not self.resume or self.path is None or not os.path.exists(self.checkpoint_path(name, key)):
+            return None
+        with open(self.checkpoint_path(name, key), 'rb') as f:
+            result = pickle.load(f)
+        self.keys[name] = key
+        self.log.append({'stage': name, 'key': key[:24], 'status': 'resumed', 'seconds': 0.0})
+        return result
+
+    def save(self, name, key, result, seconds=0.0):
+        self.keys[name] = key
+        self.log.append({'stage': name, 'key': key[:24], 'status': 'ran', 'seconds': seconds})
+        if self.path is None:
+            return
+        path = self.checkpoint_path(name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written next to the target and renamed, a crash mid-write never leaves a readable half checkpoint
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        self.evict(name)
+
+    def stage(self, name, fn, inputs=(), params=None):
+        key = self.key(name, inputs, params)
+        result = self.load(name, key)
+        if result is None:
+            start = time.perf_counter()
+            with self.timed(name):
+                result = fn()
+            self.save(name, key, result, time.perf_counter() - start)
+        return result
+
+    def evict(self, name):
+        stage_dir = os.path.join(self.path, name)
+        checkpoints = sorted((os.path.join(stage_dir, f) for f in os.listdir(stage_dir) if f.endswith('.pkl')), key=os.path.getmtime, reverse=True)
+        for old in checkpoints[self.keep_versions:]:
+            os.remove(old)
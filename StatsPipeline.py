@@ -1,41 +1,51 @@
 import os
+import RunReport as rr
 output_dir = 'stats'
 
 class StatsPipeline:
-    def __init__(self,loader,preprocessor):
+    def __init__(self,loader,preprocessor,profiler=None):
         self.loader = loader
         self.preprocessor = preprocessor
+        self.report = None
+        self.profiler = profiler
 
     def run(self):
-        
-        teams_for = self.loader.load_data_selenium('https://fbref.com/en/comps/9/Premier-League-Stats#all_stats_squads_gca','stats_squads_standard_for')  
-        print(f'Loaded teams for stats: {teams_for is not None}')
-        teams_against = self.loader.load_data_selenium('https://fbref.com/en/comps/9/Premier-League-Stats#all_stats_squads_gca','stats_squads_standard_against')    
-        print(f'Loaded teams against stats: {teams_against is not None}')
-
-        teams_for = self.preprocessor.stats_teams_prepocessing(teams_for,False)
-        teams_against = self.preprocessor.stats_teams_prepocessing(teams_against,True)
-        teams_for.to_csv(f"{output_dir}/teams_for.csv",index=False)
-        teams_against.to_csv(f"{output_dir}/teams_against.csv",index=False)
-
-        goalkeepers_stats = self.loader.load_data_selenium('https://fbref.com/en/comps/9/keepers/Premier-League-Stats','stats_keeper')
-        print(f'Loaded goalkeepers stats: {goalkeepers_stats is not None}')
-        goalkeepers_stats = self.preprocessor.stats_gk_preprocessing(goalkeepers_stats)
-        goalkeepers_stats.to_csv(f"{output_dir}/goalkeepers.csv",index=False)
-
-        defence_stats = self.loader.load_data_selenium('https://fbref.com/en/comps/9/defense/Premier-League-Stats','stats_defense')
-        print(f'Loaded defence stats: {defence_stats is not None}')
-        defence_stats = self.preprocessor.stats_defence_preprocessing(defence_stats)
-        defence_stats.to_csv(f"{output_dir}/defenders.csv",index=False)
-
-        passing_stats = self.loader.load_data_selenium('https://fbref.com/en/comps/9/passing/Premier-League-Stats','stats_passing')
-        print(f'Loaded passing stats: {passing_stats is not None}')
-        passing_stats = self.preprocessor.stats_passing_preprocessing(passing_stats)
-        passing_stats.to_csv(f"{output_dir}/passing.csv",index=False)
-
-        shooting_stats = self.loader.load_data_selenium('https://fbref.com/en/comps/9/shooting/Premier-League-Stats','stats_shooting')
-        print(f'Loaded shooting stats: {shooting_stats is not None}')
-        shooting_stats = self.preprocessor.stats_shooting_preprocessing(shooting_stats)
-        shooting_stats.to_csv(f"{output_dir}/shooting.csv",index=False)
-
-        
\ No newline at end of file
+        self.report = rr.RunReport('stats', self.loader.session, profiler=self.profiler)
+
+        with self.report.stage('teams'):
+            teams_for = self.loader.load_data_selenium('https://fbref.com/en/comps/9/Premier-League-Stats#all_stats_squads_gca','stats_squads_standard_for')  
+            print(f'Loaded teams for stats: {teams_for is not None}')
+            teams_against = self.loader.load_data_selenium('https://fbref.com/en/comps/9/Premier-League-Stats#all_stats_squads_gca','stats_squads_standard_against')    
+            print(f'Loaded teams against stats: {teams_against is not None}')
+
+            teams_for = self.preprocessor.stats_teams_prepocessing(teams_for,False)
+            teams_against = self.preprocessor.stats_teams_prepocessing(teams_against,True)
+            teams_for.to_csv(f"{output_dir}/teams_for.csv",index=False)
+            teams_against.to_csv(f"{output_dir}/teams_against.csv",index=False)
+
+        with self.report.stage('goalkeepers'):
+            goalkeepers_stats = self.loader.load_data_selenium('https://fbref.com/en/comps/9/keepers/Premier-League-Stats','stats_keeper')
+            print(f'Loaded goalkeepers stats: {goalkeepers_stats is not None}')
+            goalkeepers_stats = self.preprocessor.stats_gk_preprocessing(goalkeepers_stats)
+            goalkeepers_stats.to_csv(f"{output_dir}/goalkeepers.csv",index=False)
+
+        with self.report.stage('defence'):
+            defence_stats = self.loader.load_data_selenium('https://fbref.com/en/comps/9/defense/Premier-League-Stats','stats_defense')
+            print(f'Loaded defence stats: {defence_stats is not None}')
+            defence_stats = self.preprocessor.stats_defence_preprocessing(defence_stats)
+            defence_stats.to_csv(f"{output_dir}/defenders.csv",index=False)
+
+        with self.report.stage('passing'):
+            passing_stats = self.loader.load_data_selenium('https://fbref.com/en/comps/9/passing/Premier-League-Stats','stats_passing')
+            print(f'Loaded passing stats: {passing_stats is not None}')
+            passing_stats = self.preprocessor.stats_passing_preprocessing(passing_stats)
+            passing_stats.to_csv(f"{output_dir}/passing.csv",index=False)
+
+        with self.report.stage('shooting'):
+            shooting_stats = self.loader.load_data_selenium('https://fbref.com/en/comps/9/shooting/Premier-League-Stats','stats_shooting')
+            print(f'Loaded shooting stats: {shooting_stats is not None}')
+            shooting_stats = self.preprocessor.stats_shooting_preprocessing(shooting_stats)
+            shooting_stats.to_csv(f"{output_dir}/shooting.csv",index=False)
+
+        # the fbref tables are read through selenium, so the http columns stay at 0 here
+        print(f"Run report {self.report.write()}")
@@ -0,0 +1,420 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import HistoryStore as hs
+import FantasyPredicorPipeline as fpp
+import FantasyModel as fm
+import FeatureEngineering as fe
+import FeatureStore as fs
+import PredictionTable as pt
+import RollingForm as rf
+
+def measure(fn, trace_memory=False):
+    # wall time and, when asked, peak python/numpy allocations of one call (tracing slows the call down)
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def arrow_peak(fn, interval=0.0005):
+    # peak bytes held by pyarrow's memory pool during one call, sampled from a thread; tracemalloc does not see them
+    base = pa.total_allocated_bytes()
+    peak = [base]
+    stopped = threading.Event()
+    def sample():
+        while not stopped.wait(interval):
+            peak[0] = max(peak[0], pa.total_allocated_bytes())
+    thread = threading.Thread(target=sample, daemon=True)
+    thread.start()
+    try:
+        result = fn()
+        peak[0] = max(peak[0], pa.total_allocated_bytes())
+    finally:
+        stopped.set()
+        thread.join()
+    return result, peak[0] - base
+
+def benchmark_history_storage(csv_path='all_players_neeew.csv', repeats=5):
+    print(f"History storage: {csv_path}")
+    csv_df = pd.read_csv(csv_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = hs.HistoryStore(tmp)
+        store.write('history', csv_df, partition_col='round')
+        columns = ['element', 'round', 'total_points', 'minutes', 'expected_goals', 'ict_index']
+        cases = [
+            ('csv, all columns', lambda: pd.read_csv(csv_path)),
+            ('parquet, all columns', lambda: store.read('history')),
+            ('csv, 6 columns', lambda: pd.read_csv(csv_path, usecols=columns)),
+            ('parquet, 6 columns', lambda: store.read('history', columns=columns)),
+            ('parquet, last 5 rounds', lambda: store.read('history', filters=[('round', '>', int(csv_df['round'].max()) - 5)])),
+        ]
+        for name, fn in cases:
+            times = []
+            for _ in range(repeats):
+                df, elapsed, _ = measure(fn)
+                times.append(elapsed)
+            _, _, peak = measure(fn, trace_memory=True)
+            _, arrow = arrow_peak(fn)
+            print(f"  {name:<24} rows={len(df):>6} load={min(times) * 1000:8.1f} ms  "
+                  f"frame={df.memory_usage(deep=True).sum() / 2**20:6.2f} MiB  "
+                  f"peak alloc python={peak / 2**20:6.2f} MiB arrow={arrow / 2**20:6.2f} MiB")
+        size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(store.table_path('history')) for f in files)
+        print(f"  on disk: csv={os.path.getsize(csv_path) / 2**20:.2f} MiB  parquet={size / 2**20:.2f} MiB")
+
+def synthetic_teams(n_teams=20, seed=0):
+    rng = np.random.default_rng(seed)
+    teams = pd.DataFrame({'id': np.arange(1, n_teams + 1), 'name': [f'Team {i}' for i in range(1, n_teams + 1)],
+                          'strength': rng.integers(2, 6, n_teams)})
+    for col in ['strength_overall_home', 'strength_overall_away', 'strength_attack_home', 'strength_attack_away',
+                'strength_defence_home', 'strength_defence_away']:
+        teams[col] = rng.integers(1000, 1400, n_teams)
+    return teams
+
+def synthetic_fixtures(n_events=38, n_teams=20, finished_events=None, seed=0):
+    # every team plays once per event against a random opponent
+    rng = np.random.default_rng(seed)
+    finished_events = n_events if finished_events is None else finished_events
+    rows = []
+    for event in range(1, n_events + 1):
+        order = rng.permutation(np.arange(1, n_teams + 1))
+        for home, away in zip(order[::2], order[1::2]):
+            rows.append({'id': len(rows) + 1, 'event': event, 'team_h': home, 'team_a': away,
+                         'finished': event <= finished_events, 'team_h_difficulty': 3, 'team_a_difficulty': 3})
+    return pd.DataFrame(rows)
+
+def synthetic_history(n_rows, fixtures, seed=0):
+    rng = np.random.default_rng(seed)
+    finished = fixtures[fixtures['finished']]
+    picked = finished.iloc[rng.integers(0, len(finished), n_rows)].reset_index(drop=True)
+    was_home = rng.random(n_rows) < 0.5
+    return pd.DataFrame({
+        'id': rng.integers(1, 700, n_rows),
+        'fixture': picked['id'].values,
+        'round': picked['event'].values,
+        'was_home': was_home,
+        'team': np.where(was_home, picked['team_h'], picked['team_a']),
+        'opponent_team': np.where(was_home, picked['team_a'], picked['team_h']),
+        'minutes': rng.choice([0, 0, 20, 45, 60, 90, 90, 90], n_rows),
+        'total_points': rng.integers(0, 15, n_rows),
+    })
+
+def benchmark_pipeline(fixtures, teams):
+    pipeline = fpp.FantasyPredicorPipeline(None, None, fm.FantasyModel(1), fm.FantasyModel(2), fm.FantasyModel(3), None)
+    pipeline.fixtures = fixtures
+    pipeline.team_stats = teams
+    return pipeline
+
+def legacy_append_team(pipeline, df):
+    # the previous iterrows implementation, kept here as the reference for the benchmark
+    fixt = pipeline.fixtures[pipeline.fixtures['finished'] == True]
+    df_merged = pd.merge(fixt.add_prefix("fixtures_"), pipeline.team_stats.add_prefix("awayteam_"), left_on="fixtures_team_a", right_on="awayteam_id", how="inner")
+    df_merged = pd.merge(df_merged, pipeline.team_stats.add_prefix('hometeam_'), left_on="fixtures_team_h", right_on="hometeam_id", how="inner")
+    df_merged = pd.merge(df.add_prefix("player_"), df_merged, left_on="player_fixture", right_on="fixtures_id", how="inner")
+    for idx, row in df_merged.iterrows():
+        if row['player_minutes'] == 0:
+            df_merged.loc[idx, 'player_will_play'] = 0
+        elif row['player_minutes'] < 60:
+            df_merged.loc[idx, 'player_will_play'] = 0.7
+        else:
+            df_merged.loc[idx, 'player_will_play'] = 1
+        side, other = ('awayteam', 'hometeam') if row['player_was_home'] == False else ('hometeam', 'awayteam')
+        side_venue, other_venue = ('away', 'home') if side == 'awayteam' else ('home', 'away')
+        df_merged.loc[idx, 'player_team_strength'] = row[f'{side}_strength']
+        df_merged.loc[idx, 'player_team_strength_overall'] = row[f'{side}_strength_overall_{side_venue}']
+        df_merged.loc[idx, 'player_team_strength_attack'] = row[f'{side}_strength_attack_{side_venue}']
+        df_merged.loc[idx, 'player_team_strength_defence'] = row[f'{side}_strength_defence_{side_venue}']
+        df_merged.loc[idx, 'opponent_team_strength'] = row[f'{other}_strength']
+        df_merged.loc[idx, 'opponent_team_strength_overall'] = row[f'{other}_strength_overall_{other_venue}']
+        df_merged.loc[idx, 'opponent_team_strength_attack'] = row[f'{other}_strength_attack_{other_venue}']
+        df_merged.loc[idx, 'opponent_team_strength_defence'] = row[f'{other}_strength_defence_{other_venue}']
+    return df_merged
+
+def benchmark_append_team(n_rows=100_000, legacy_rows=10_000):
+    # the iterrows version is timed on a slice and scaled up, it takes minutes on the full frame
+    print(f"append_team on {n_rows} synthetic history rows")
+    fixtures = synthetic_fixtures()
+    teams = synthetic_teams()
+    history = synthetic_history(n_rows, fixtures)
+    pipeline = benchmark_pipeline(fixtures, teams)
+
+    vectorized, vec_time, _ = measure(lambda: pipeline.append_team(history))
+    sample = history.iloc[:legacy_rows]
+    legacy, legacy_time, _ = measure(lambda: legacy_append_team(pipeline, sample))
+    legacy_estimate = legacy_time * n_rows / len(sample)
+
+    check = pipeline.append_team(sample)
+    cols = ['player_will_play'] + [f'{side}_{col}' for side in ('player', 'opponent') for col, _, _ in fpp.TEAM_STRENGTH_COLUMNS]
+    identical = np.allclose(check[cols].to_numpy(dtype=float), legacy[cols].to_numpy(dtype=float)) and list(check.columns) == list(legacy.columns)
+    print(f"  vectorized: {vec_time:8.3f} s for {len(vectorized)} rows")
+    print(f"  iterrows:   {legacy_time:8.3f} s for {len(sample)} rows, ~{legacy_estimate:.1f} s for {n_rows} rows")
+    print(f"  speedup ~{legacy_estimate / vec_time:.0f}x, identical output on the slice: {identical}")
+
+# rough row counts per position in one season of history
+POSITION_ROWS = {1: 900, 2: 4200, 3: 5200, 4: 1600}
+
+def synthetic_training_matrix(n_rows, n_features=50, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n_rows, n_features)), columns=[f'f{i}' for i in range(n_features)])
+    y = pd.Series(np.clip(X['f0'] * 2 + X['f1'] + rng.normal(scale=2, size=n_rows), 0, None) + 1)
+    return X, y
+
+def benchmark_training_scaling(cores=(1, 2, 4, 8)):
+    # wall time of fitting all four position models under each cpu budget
+    print("Position model training, sequential vs parallel under a cpu budget")
+    data = [synthetic_training_matrix(n_rows, seed=position) for position, n_rows in POSITION_ROWS.items()]
+    positions = [1, 2, 3, 3]
+    for cpu_budget in cores:
+        jobs = [(fm.FantasyModel(position), X, y, None) for position, (X, y) in zip(positions, data)]
+        _, elapsed, _ = measure(lambda: fm.train_in_parallel(jobs, cpu_budget))
+        print(f"  {cpu_budget} cores: {elapsed:8.1f} s (machine has {os.cpu_count()})")
+
+SEARCH_POSITIONS = {'goalkeepers': 1, 'defenders': 2, 'midfielders': 3, 'forwards': 3}
+
+def position_training_matrices(path=fs.store_dir):
+    # the train matrices of the newest data version per position, as written by a pipeline run with a feature store;
+    # these are the features the models are fitted on, same-match stats like bonus and bps are not in them
+    store = fs.FeatureStore(path)
+    matrices = {}
+    for name in SEARCH_POSITIONS:
+        for version in sorted(store.versions(name), key=os.path.getmtime, reverse=True):
+            with open(os.path.join(version, 'meta.json')) as f:
+                meta = json.load(f)
+            train = store.load(name, meta['gw'], meta['fingerprint'], 'train')
+            if train is not None:
+                matrices[name] = (train.drop(columns=[fpp.TARGET_COLUMN, fpp.ROUND_COLUMN]), train[fpp.TARGET_COLUMN])
+                break
+    return matrices
+
+def benchmark_search(path=fs.store_dir, time_budget=None):
+    print(f"Hyperparameter search on the position feature matrices in {path}")
+    matrices = position_training_matrices(path)
+    if not matrices:
+        print("  no train matrices found, run predict_main.py with a feature store first")
+        return
+    for name, (X, y) in matrices.items():
+        reports = []
+        for search in ['random', 'halving']:
+            model = fm.FantasyModel(SEARCH_POSITIONS[name], search=search, time_budget=time_budget)
+            model.train(X.copy(), y)
+            reports.append(model.search_report)
+        report = pd.DataFrame(reports).set_index('search')
+        print(f"  {name}, {len(X)} rows x {X.shape[1]} features")
+        print(report.round(4).to_string())
+        random_report, halving_report = reports
+        # best_rounds is the tree count each best_score was cross validated at
+        print(f"  halving: {random_report['fit_time_s'] / halving_report['fit_time_s']:.1f}x faster, "
+              f"best CV R2 {halving_report['best_score'] - random_report['best_score']:+.4f} against random search")
+
+def legacy_adjust_predictions(position, X, Y, status_map):
+    # the previous iterrows implementation of FantasyModel.predict's adjustments
+    added_numbers = pd.DataFrame()
+    metric_columns, diff_column, negative_multiplier, positive_multiplier = fm.ADJUSTMENT_RULES[position]
+    for idx, row in X.iterrows():
+        metric = row[metric_columns[0]] if len(metric_columns) == 1 else row[metric_columns[0]] + row[metric_columns[1]]
+        if row[diff_column] < 0:
+            added_numbers.loc[idx, 'expected_CS_points'] = -1*(1-metric) * negative_multiplier
+        else:
+            added_numbers.loc[idx, 'expected_CS_points'] = metric * positive_multiplier
+    Y = Y + added_numbers['expected_CS_points']
+    X['player_will_play'] = X['player_will_play'].round()
+    Y = Y * X['player_will_play']
+    Y = Y.clip(lower=0)
+    for idx, row in X.iterrows():
+        if status_map.get(row['player_id']) != 'a':
+            Y.loc[idx] = 0
+    return np.round(Y, 2)
+
+def synthetic_prediction_matrix(n_players=700, n_gameweeks=5, seed=0):
+    rng = np.random.default_rng(seed)
+    n_rows = n_players * n_gameweeks
+    X = pd.DataFrame({
+        'player_id': np.tile(np.arange(1, n_players + 1), n_gameweeks),
+        'player_will_play': rng.choice([0, 0.7, 1], n_rows),
+        'clean_sheets_per_match': rng.random(n_rows) * 0.6,
+        'goals_per_match': rng.random(n_rows) * 0.5,
+        'assists_per_match': rng.random(n_rows) * 0.4,
+        'diff_def_att': rng.normal(scale=100, size=n_rows),
+        'diff_att_def': rng.normal(scale=100, size=n_rows),
+    })
+    status_map = {pid: rng.choice(['a', 'a', 'a', 'd', 'i']) for pid in range(1, n_players + 1)}
+    return X, np.round(rng.normal(2, 1.5, n_rows), 2), status_map
+
+def benchmark_predict_adjustments(n_players=700, n_gameweeks=5):
+    print(f"Prediction adjustments, {n_players} players x {n_gameweeks} gameweeks")
+    X, Y, status_map = synthetic_prediction_matrix(n_players, n_gameweeks)
+    for position in fm.ADJUSTMENT_RULES:
+        model = fm.FantasyModel(position)
+        available = X['player_id'].map(status_map).eq('a').to_numpy()
+        vectorized, vec_time, _ = measure(lambda: model.adjust_predictions(X.copy(), Y, available))
+        legacy, legacy_time, _ = measure(lambda: legacy_adjust_predictions(position, X.copy(), Y, status_map))
+        identical = np.allclose(vectorized.to_numpy(), legacy.to_numpy(), rtol=0, atol=0, equal_nan=True)
+        print(f"  position {position}: vectorized {vec_time * 1000:7.2f} ms, iterrows {legacy_time * 1000:8.1f} ms, "
+              f"{legacy_time / vec_time:6.0f}x, identical: {identical}")
+
+def synthetic_predictions(n_players=700, n_gameweeks=38, seed=0):
+    # one row per player and fixture, roughly one in twenty gameweeks is a double
+    rng = np.random.default_rng(seed)
+    gws = np.repeat(np.arange(1, n_gameweeks + 1), n_players)
+    players = np.tile(np.arange(1, n_players + 1), n_gameweeks)
+    doubles = rng.random(len(gws)) < 0.05
+    df = pd.DataFrame({'player_id': np.concatenate([players, players[doubles]]), 'gw': np.concatenate([gws, gws[doubles]])})
+    df['fixture_id'] = np.arange(len(df)) % 380 + 1
+    df['predicted_points'] = np.round(rng.normal(2, 1.5, len(df)), 2)
+    return df
+
+def legacy_range_totals(df, start_gw, end_gw):
+    # the previous output path: one frame per gameweek, outer merged, gw_* columns summed
+    final_df = None
+    for gw in range(start_gw, end_gw + 1):
+        gw_data = df[df['gw'] == gw].groupby('player_id', as_index=False)['predicted_points'].sum()
+        gw_data = gw_data.rename(columns={'predicted_points': f'gw_{gw}'})
+        final_df = gw_data if final_df is None else final_df.merge(gw_data, on=['player_id'], how='outer')
+    gw_columns = [col for col in final_df.columns if col.startswith('gw_')]
+    return final_df.set_index('player_id')[gw_columns].sum(axis=1).round(2)
+
+def benchmark_prediction_output(n_players=700, n_gameweeks=38, queries=100):
+    print(f"Prediction output, {n_players} players x {n_gameweeks} gameweeks, {queries} range queries")
+    df = synthetic_predictions(n_players, n_gameweeks)
+    rng = np.random.default_rng(1)
+    ranges = [tuple(sorted(rng.integers(1, n_gameweeks + 1, 2))) for _ in range(queries)]
+
+    table, build_time, _ = measure(lambda: pt.PredictionTable.from_predictions([('midfielders', df)]))
+    _, prefix_time, _ = measure(table.prefix)
+    totals, query_time, _ = measure(lambda: [table.range_totals(start, end) for start, end in ranges])
+    legacy, legacy_time, _ = measure(lambda: [legacy_range_totals(df, start, end) for start, end in ranges])
+    identical = all(np.allclose(t.reindex(l.index).to_numpy(), l.to_numpy(), atol=0.011) for t, l in zip(totals, legacy))
+    print(f"  build {build_time * 1000:.1f} ms, prefix {prefix_time * 1000:.1f} ms")
+    print(f"  prefix sums {query_time * 1000 / queries:7.3f} ms/query, outer merges {legacy_time * 1000 / queries:8.2f} ms/query, "
+          f"{legacy_time / query_time:5.0f}x, matching: {identical}")
+
+FEATURE_STAT_COLUMNS = ['goals_scored', 'assists', 'clean_sheets', 'goals_conceded', 'saves', 'starts', 'recoveries',
+                        'tackles', 'clearances_blocks_interceptions', 'defensive_contribution']
+
+def synthetic_feature_history(n_rows, fixtures, seed=0):
+    history = synthetic_history(n_rows, fixtures, seed)
+    rng = np.random.default_rng(seed + 1)
+    for col in FEATURE_STAT_COLUMNS:
+        history[col] = rng.integers(0, 4, n_rows)
+    history['element_type'] = rng.integers(1, 5, n_rows)
+    return history
+
+class LegacyFeatureEngineering(fe.FeatureEngineering):
+    # the previous implementation, every call regroups the full history
+    def add_features(self, players, full_df, position, train):
+        players = self.all_positions_common(players)
+        if position == 1:
+            team_goals_scored = full_df.groupby('team')['goals_scored'].sum().reset_index()
+            team_goals_scored.columns = ['opponent_team', 'opponent_team_total_goals']
+            players = players.merge(team_goals_scored, left_on='player_opponent_team', right_on='opponent_team', how='left').drop('opponent_team', axis=1)
+        else:
+            team_stats = full_df.groupby('team').agg({'goals_scored': 'sum', 'goals_conceded': 'sum', 'clean_sheets': 'sum', 'saves': 'sum'}).reset_index()
+            team_stats.columns = ['opponent_team', 'opponent_team_total_goals_scored', 'opponent_team_total_goals_conceded',
+                                  'opponent_team_total_clean_sheets', 'opponent_team_total_saves']
+            players = players.merge(team_stats, left_on='player_opponent_team', right_on='opponent_team', how='left').drop('opponent_team', axis=1)
+        if train:
+            numerator = full_df.groupby(['team','fixture'])['defensive_contribution'].transform('sum')
+            denominator = full_df.groupby(['team','fixture'])['goals_conceded'].transform('max')
+            players['team_defense_efficiency'] = numerator / (denominator + 1e-6)
+        return players
+
+def count_groupbys(fn, frame):
+    # number of DataFrame.groupby calls made on frames as long as the full history
+    calls = [0]
+    original = pd.DataFrame.groupby
+    def counting(self, *args, **kwargs):
+        if len(self) == len(frame):
+            calls[0] += 1
+        return original(self, *args, **kwargs)
+    pd.DataFrame.groupby = counting
+    try:
+        result = fn()
+    finally:
+        pd.DataFrame.groupby = original
+    return result, calls[0]
+
+def benchmark_team_aggregates(n_rows=25_000, n_gameweeks=5):
+    print(f"Team aggregates, {n_rows} history rows, train + {n_gameweeks} predict calls per position")
+    teams = synthetic_teams()
+    fixtures = synthetic_fixtures(finished_events=30)
+    full_df = synthetic_feature_history(n_rows, fixtures)
+    pipeline = benchmark_pipeline(fixtures, teams)
+    frames = {position: pipeline.append_team(full_df[full_df['element_type'] == position]) for position in range(1, 5)}
+
+    def run(feature_engineering):
+        outputs = []
+        for position, frame in frames.items():
+            code = min(position, 3)
+            outputs.append(feature_engineering.add_features(frame.copy(), full_df, code, True))
+            for _ in range(n_gameweeks):
+                outputs.append(feature_engineering.add_features(frame.copy(), full_df, code, False))
+        return outputs
+
+    (legacy, legacy_calls), legacy_time, _ = measure(lambda: count_groupbys(lambda: run(LegacyFeatureEngineering()), full_df))
+    (shared, shared_calls), shared_time, _ = measure(lambda: count_groupbys(lambda: run(fe.FeatureEngineering()), full_df))
+    identical = all(l.equals(s[l.columns]) for l, s in zip(legacy, shared))
+    print(f"  per call groupbys: {legacy_calls:3d} full-frame groupbys, {legacy_time * 1000:8.1f} ms")
+    print(f"  team aggregates:   {shared_calls:3d} full-frame groupbys, {shared_time * 1000:8.1f} ms, identical: {identical}")
+
+def benchmark_as_of(n_rows=25_000):
+    print(f"As-of team totals, {n_rows} history rows, one table per cutoff gameweek and one lookup per row")
+    fixtures = synthetic_fixtures(finished_events=30)
+    full_df = synthetic_feature_history(n_rows, fixtures)
+    cutoffs = range(1, 32)
+
+    engine, build_time, _ = measure(lambda: fe.AsOfAggregates(full_df, 'team', fe.TEAM_TOTAL_COLUMNS))
+    tables, table_time, _ = measure(lambda: [engine.table(gw) for gw in cutoffs])
+    rescans, rescan_time, _ = measure(lambda: [full_df[full_df['round'] < gw].groupby('team')[fe.TEAM_TOTAL_COLUMNS].sum() for gw in cutoffs])
+    identical = all(np.array_equal(t.set_index('team').reindex(r.index).to_numpy(), r.to_numpy()) for t, r in zip(tables, rescans) if len(r) > 0)
+    print(f"  build {build_time * 1000:.1f} ms, cumulative sums {table_time * 1000:7.1f} ms, rescans {rescan_time * 1000:8.1f} ms, "
+          f"{rescan_time / (build_time + table_time):5.1f}x, identical: {identical}")
+
+    rows, row_time, _ = measure(lambda: engine.before(full_df['opponent_team'], full_df['round']))
+    print(f"  strictly-before totals for every history row: {row_time * 1000:.1f} ms")
+
+def benchmark_rolling_form(n_players=700, n_gameweeks=30, n_columns=30):
+    print(f"Rolling form, {n_players} players x {n_gameweeks} gameweeks x {n_columns} columns")
+    rng = np.random.default_rng(0)
+    columns = [f'stat_{i}' for i in range(n_columns)]
+    df = pd.DataFrame(rng.integers(0, 5, (n_players * n_gameweeks, n_columns)).astype(float), columns=columns)
+    df.insert(0, 'player_id', np.tile(np.arange(1, n_players + 1), n_gameweeks))
+    df.iloc[rng.random(len(df)) < 0.01, 1] = np.nan
+
+    def legacy_latest(frame):
+        rolled = frame.groupby('player_id')[columns].rolling(window=5, min_periods=1).mean().round(3).reset_index()
+        return rolled.groupby('player_id').last().reset_index()[['player_id', *columns]]
+
+    legacy, legacy_time, _ = measure(lambda: legacy_latest(df))
+    latest, latest_time, _ = measure(lambda: rf.last_form(df, columns))
+    identical = np.allclose(latest[columns].to_numpy(), legacy[columns].to_numpy(), equal_nan=True)
+    print(f"  latest averages: groupby rolling {legacy_time * 1000:8.1f} ms, last rows {latest_time * 1000:6.1f} ms, "
+          f"{legacy_time / latest_time:5.0f}x, identical: {identical}")
+
+BENCHMARKS = {
+    'storage': benchmark_history_storage,
+    'append_team': benchmark_append_team,
+    'training': benchmark_training_scaling,
+    'search': benchmark_search,
+    'predict': benchmark_predict_adjustments,
+    'prediction_output': benchmark_prediction_output,
+    'team_aggregates': benchmark_team_aggregates,
+    'as_of': benchmark_as_of,
+    'rolling_form': benchmark_rolling_form,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -1,11 +1,12 @@
 import DataLoader as dl
+import ResponseCache as rc
 import DataPreprocessing as dp
 import FeatureEngineering as fe
 import LiveStats as ls
 import pandas as pd
 
 if __name__ == "__main__":
-    loader = dl.DataLoader()
+    loader = dl.DataLoader(cache=rc.ResponseCache('cache'))
     preprocessor = dp.DataPreprocessing()
 
     liveStatsPipeline = ls.LiveStats(loader,preprocessor)
@@ -1,20 +1,32 @@
+import sys
 import DataLoader as dl
+import ResponseCache as rc
 import DataPreprocessing as dp
 import FeatureEngineering as fe
 import FantasyPredicorPipeline as fpp
 import FantasyModel as fm
+import ModelRegistry as mr
+import FeatureStore as fs
+import StageGraph as sg
+import Profiler as pf
+import BootstrapSnapshot as bs
 
 if __name__ == "__main__":
-    loader = dl.DataLoader()
+    loader = dl.DataLoader(cache=rc.ResponseCache('cache'))
     preprocessor = dp.DataPreprocessing()
     feature_engineering = fe.FeatureEngineering()
-    goalkeeper_model = fm.FantasyModel(1)
-    defender_model = fm.FantasyModel(2)
-    attacker_model = fm.FantasyModel(3)
-    fantasyPredictorPipeline = fpp.FantasyPredicorPipeline(loader,preprocessor,goalkeeper_model,defender_model,attacker_model,feature_engineering)
+    registry = mr.ModelRegistry()
+    goalkeeper_model = fm.FantasyModel(1, registry=registry, name='goalkeepers', update='boost')
+    defender_model = fm.FantasyModel(2, registry=registry, name='defenders', update='boost')
+    attacker_model = fm.FantasyModel(3, registry=registry, name='midfielders', update='boost')
+    forward_model = fm.FantasyModel(3, registry=registry, name='forwards', update='boost')
+    fantasyPredictorPipeline = fpp.FantasyPredicorPipeline(loader,preprocessor,goalkeeper_model,defender_model,attacker_model,feature_engineering,incremental=True,forward_model=forward_model,feature_store=fs.FeatureStore(),
+                                                            stage_graph=sg.StageGraph(resume='--resume' in sys.argv),
+                                                            # --profile or FPL_PROFILE=<dir> writes one collapsed-stack flamegraph per stage
+                                                            profiler=pf.StageProfiler.from_args())
 
-    deadlines = loader.load_data_api('https://fantasy.premierleague.com/api/bootstrap-static/','events')
-    finished_gw = dp.DataPreprocessing().get_current_gw(deadlines) - 1
+    finished_gw = bs.BootstrapSnapshot.shared(loader).get_current_gw() - 1
 
-    position_dictionaries = fantasyPredictorPipeline.run(finished_gw+1,finished_gw+5)
+    # --season projects every remaining gameweek into predictions/season_projections.csv
+    position_dictionaries = fantasyPredictorPipeline.run(finished_gw+1,finished_gw+5,season='--season' in sys.argv)
 
@@ -2,12 +2,14 @@ import DataLoader as dl
 import DataPreprocessing as dp
 import FeatureEngineering as fe
 import PriceChanges as pc
+import Profiler as pf
 import pandas as pd
 
 if __name__ == "__main__":
     loader = dl.DataLoader()
     preprocessor = dp.DataPreprocessing()
 
-    price_pipeline = pc.PriceChanges(loader,preprocessor)
+    # --profile or FPL_PROFILE=<dir> writes one collapsed-stack flamegraph per stage
+    price_pipeline = pc.PriceChanges(loader,preprocessor,profiler=pf.StageProfiler.from_args())
     price_pipeline.run()
     print("Price Changes Pipeline completed successfully.")
\ No newline at end of file
@@ -1,13 +1,15 @@
 import DataLoader as dl
 import DataPreprocessing as dp
 import StatsPipeline as sp
+import Profiler as pf
 
 if __name__ == "__main__":
     loader = dl.DataLoader()
     preprocessor = dp.DataPreprocessing()
     # feature_engineering = fe.FeatureEngineering()
 
-    statsPipeline = sp.StatsPipeline(loader,preprocessor)
+    # --profile or FPL_PROFILE=<dir> writes one collapsed-stack flamegraph per stage
+    statsPipeline = sp.StatsPipeline(loader,preprocessor,profiler=pf.StageProfiler.from_args())
     statsPipeline.run()
     print("Stats Pipeline completed successfully.")
 
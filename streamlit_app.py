@@ -2,6 +2,9 @@ import streamlit as st
 import DataLoader as dl
 import DataPreprocessing as dp
 import LiveStats as ls
+import BootstrapSnapshot as bs
+import ResponseCache as rc
+import PredictionTable as pt
 import pandas as pd
 import time
 import plotly.express as px
@@ -211,6 +214,11 @@ st.markdown("""
     <meta name="author" content="Zain Tamer">
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_response_cache():
+    # one on-disk api cache shared by every session and rerun
+    return rc.ResponseCache('cache')
+
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def load_predictions_data():
     with st.spinner("📊 Loading prediction data..."):
@@ -236,6 +244,21 @@ def load_predictions_data():
             st.exception(e)
             return {}
 
+@st.cache_resource(ttl=3600)
+def load_prediction_table():
+    # long prediction table with per-player running sums, None when only the csvs were published
+    file_path = os.path.join("predictions", "predictions.parquet")
+    if not os.path.exists(file_path):
+        return None
+    return pt.PredictionTable.read(file_path)
+
+def range_totals(df, start_gw, end_gw, gw_cols):
+    # predicted points over the selected gameweeks, a difference of two running sums when the table is available
+    table = load_prediction_table()
+    if table is None or 'player_id' not in df.columns:
+        return df[gw_cols].sum(axis=1)
+    return df['player_id'].map(table.range_totals(start_gw, end_gw)).fillna(0)
+
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def load_stats(name):
     with st.spinner(f"📊 Loading {name} stats..."):
@@ -541,9 +564,8 @@ with st.sidebar:
  
     # Current gameweek info
     try:
-        loader = dl.DataLoader()
-        deadlines = loader.load_data_api('https://fantasy.premierleague.com/api/bootstrap-static/','events')
-        finished_gw = dp.DataPreprocessing().get_current_gw(deadlines) - 1
+        loader = dl.DataLoader(cache=get_response_cache())
+        finished_gw = bs.BootstrapSnapshot.shared(loader, max_age=3600).get_current_gw() - 1
         st.markdown(f"### 📅 Current Status")
         st.success(f"Latest GW data update: **{17}**")
     except:
@@ -640,7 +662,7 @@ if st.session_state.active_tab == "🎯 Predictions":
                                 gw_cols_to_sum = [f"gw_{gw}" for gw in range(start_gw, end_gw + 1)]
                                 existing_gw_cols = [col for col in gw_cols_to_sum if col in df_display.columns]
                                 if existing_gw_cols:
-                                    df_display['total_points'] = df_display[existing_gw_cols].sum(axis=1)
+                                    df_display['total_points'] = range_totals(df_display, start_gw, end_gw, existing_gw_cols)
 
                                 # Remove unwanted columns if they exist
                                 df_display = df_display.drop(columns=[col for col in columns_to_hide if col in df_display.columns])
@@ -690,7 +712,7 @@ if st.session_state.active_tab == "🎯 Predictions":
                                 gw_cols_to_sum = [f"gw_{gw}" for gw in range(start_gw, end_gw + 1)]
                                 existing_gw_cols = [col for col in gw_cols_to_sum if col in df_display.columns]
                                 if existing_gw_cols:
-                                    df_display['total_points'] = df_display[existing_gw_cols].sum(axis=1)
+                                    df_display['total_points'] = range_totals(df_display, start_gw, end_gw, existing_gw_cols)
 
                                 # Remove unwanted columns if they exist
                                 df_display = df_display.drop(columns=[col for col in columns_to_hide if col in df_display.columns])
@@ -740,7 +762,7 @@ if st.session_state.active_tab == "🎯 Predictions":
                                 gw_cols_to_sum = [f"gw_{gw}" for gw in range(start_gw, end_gw + 1)]
                                 existing_gw_cols = [col for col in gw_cols_to_sum if col in df_display.columns]
                                 if existing_gw_cols:
-                                    df_display['total_points'] = df_display[existing_gw_cols].sum(axis=1)
+                                    df_display['total_points'] = range_totals(df_display, start_gw, end_gw, existing_gw_cols)
 
                                 # Remove unwanted columns if they exist
                                 df_display = df_display.drop(columns=[col for col in columns_to_hide if col in df_display.columns])
@@ -790,7 +812,7 @@ if st.session_state.active_tab == "🎯 Predictions":
                                 gw_cols_to_sum = [f"gw_{gw}" for gw in range(start_gw, end_gw + 1)]
                                 existing_gw_cols = [col for col in gw_cols_to_sum if col in df_display.columns]
                                 if existing_gw_cols:
-                                    df_display['total_points'] = df_display[existing_gw_cols].sum(axis=1)
+                                    df_display['total_points'] = range_totals(df_display, start_gw, end_gw, existing_gw_cols)
 
                                 # Remove unwanted columns if they exist
                                 df_display = df_display.drop(columns=[col for col in columns_to_hide if col in df_display.columns])
@@ -1296,11 +1318,12 @@ elif st.session_state.active_tab == "📊 Live Team Analysis":
 
         try:
             # Run the live stats pipeline
-            loader = dl.DataLoader()
+            loader = dl.DataLoader(cache=get_response_cache())
             preprocessor = dp.DataPreprocessing()
 
             liveStatsPipeline = ls.LiveStats(loader, preprocessor)
-            liveStatsPipeline.run(team_id)
+            # the web app keeps its timings in memory instead of writing a report per visit
+            liveStatsPipeline.run(team_id, write_report=False)
 
             # Extract summary fields
             summary = {
@@ -1401,7 +1424,8 @@ elif st.session_state.active_tab == "📊 Live Team Analysis":
                 value=int(total_points)
             )
 
-            starting_xi["selected_by_percent_numeric"] = starting_xi["selected_by_percent"].str.rstrip('%').astype(float)
+            # the bootstrap snapshot already parses selected_by_percent into a float
+            starting_xi["selected_by_percent_numeric"] = starting_xi["selected_by_percent"].astype(float)
             # Calculate old_percent for all rows in a vectorized manner
             starting_xi["old_percent"] = (
                 (starting_xi["selected_by_percent_numeric"] * 126613.91 
@@ -1432,7 +1456,7 @@ elif st.session_state.active_tab == "📊 Live Team Analysis":
 
             # Threats
             liveStatsPipeline.players_stats["old_percent"] = (
-                (liveStatsPipeline.players_stats["selected_by_percent"].str.rstrip('%').astype(float) * 126613.91 
+                (liveStatsPipeline.players_stats["selected_by_percent"].astype(float) * 126613.91 
                 - liveStatsPipeline.players_stats["transfers_in_event"] 
                 + liveStatsPipeline.players_stats["transfers_out_event"]) / 12661391.0 * 100.0
             )
@@ -1474,7 +1498,7 @@ elif st.session_state.active_tab == "📊 Live Team Analysis":
 
 elif st.session_state.active_tab == "🏆 FPL Top Managers 2025/2026":
     st.markdown("## 🏆 FPL Top Managers 2025/2026")
-    dl_loader = dl.DataLoader()
+    dl_loader = dl.DataLoader(cache=get_response_cache())
     live_stats_pipeline = ls.LiveStats(dl_loader, dp.DataPreprocessing())
     url = "https://fantasy.premierleague.com/api/leagues-classic/314/standings/"
     top_managers, managers_id = live_stats_pipeline.load_top_players()
@@ -1517,7 +1541,7 @@ elif st.session_state.active_tab == "🏆 FPL Top Managers 2025/2026":
 
 elif st.session_state.active_tab == "💎 FPL Elite Managers":
     st.markdown("## 💎 FPL Elite Managers")
-    dl_loader = dl.DataLoader()
+    dl_loader = dl.DataLoader(cache=get_response_cache())
     live_stats_pipeline = ls.LiveStats(dl_loader, dp.DataPreprocessing())
 
     elite_managers = ["Ben Crellin", "Mark Hurst", "Hinoto Achumi", "John Walsh", "-Calm -",